@@ -9,6 +9,7 @@ import (
 	"google.golang.org/grpc"
 	"google.golang.org/grpc/codes"
 	"google.golang.org/grpc/credentials/insecure"
+	"google.golang.org/grpc/encoding/gzip"
 	"google.golang.org/grpc/keepalive"
 	"google.golang.org/grpc/status"
 
@@ -92,6 +93,8 @@ func (c *AIServiceClient) createConnection() (*grpc.ClientConn, error) {
 			Timeout:             c.config.KeepAliveTimeout,
 			PermitWithoutStream: true,
 		}),
+		// Compress requests; registering gzip also lets the client accept gzip responses
+		grpc.WithDefaultCallOptions(grpc.UseCompressor(gzip.Name)),
 	}
 
 	conn, err := grpc.DialContext(ctx, c.config.Address, opts...)
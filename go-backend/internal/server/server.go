@@ -256,6 +256,7 @@ func (s *Server) setupRoutes() {
 	{
 		// Log management endpoints - simplified to single endpoint for filebeat
 		v1.POST("/logs", s.handleLogUpload)
+		v1.POST("/logs/batch", s.handleBatchLogUpload)
 		v1.GET("/logs", s.handleGetLogs)
 		v1.GET("/logs/analyzed", s.handleGetAnalyzedLogs)
 		v1.GET("/analysis/results", s.handleGetAnalysisResults)
@@ -427,6 +428,52 @@ func (s *Server) handleLogUpload(c *gin.Context) {
 	})
 }
 
+// handleBatchLogUpload handles POST /api/v1/logs/batch - stores many logs in one transaction
+func (s *Server) handleBatchLogUpload(c *gin.Context) {
+	ctx := c.Request.Context()
+
+	var req BatchLogUploadRequest
+	if err := c.ShouldBindJSON(&req); err != nil {
+		s.sendErrorResponse(c, http.StatusBadRequest, "INVALID_REQUEST",
+			fmt.Sprintf("Invalid request format: %v", err))
+		return
+	}
+
+	log.Printf("INFO: handleBatchLogUpload - Logs count: %d", len(req.Logs))
+
+	// Convert to log entries
+	logEntries := make([]*models.LogEntry, len(req.Logs))
+	for i, item := range req.Logs {
+		logEntries[i] = &models.LogEntry{
+			Timestamp: item.Timestamp,
+			Level:     strings.ToUpper(item.Level),
+			Message:   item.Message,
+			Source:    item.Source,
+			Metadata:  item.Metadata,
+		}
+	}
+
+	// Create all log entries in a single transaction
+	if err := s.services.Log.CreateLogs(ctx, logEntries); err != nil {
+		s.sendErrorResponse(c, http.StatusInternalServerError, "LOG_CREATION_FAILED",
+			fmt.Sprintf("Failed to create log entries: %v", err))
+		return
+	}
+
+	logIDs := make([]string, len(logEntries))
+	for i, entry := range logEntries {
+		logIDs[i] = entry.ID
+	}
+
+	// Return success response
+	c.JSON(http.StatusCreated, gin.H{
+		"success": true,
+		"message": "Log entries created successfully",
+		"count":   len(logIDs),
+		"log_ids": logIDs,
+	})
+}
+
 // handleGetAnalysisResults handles GET /api/v1/analysis/results
 func (s *Server) handleGetAnalysisResults(c *gin.Context) {
 	ctx := c.Request.Context()
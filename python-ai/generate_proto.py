@@ -27,6 +27,17 @@ def generate_proto():
         print(f"Error: {proto_file} not found")
         return False
     
+    # 生成文件都比 .proto 新时跳过 protoc
+    generated = [
+        os.path.join(output_dir, "ai_analysis_pb2.py"),
+        os.path.join(output_dir, "ai_analysis_pb2_grpc.py"),
+    ]
+    if all(os.path.exists(p) for p in generated):
+        out_mtime = min(os.path.getmtime(p) for p in generated)
+        if out_mtime >= os.path.getmtime(proto_file):
+            print(f"Python gRPC bindings in {output_dir}/ are up to date")
+            return True
+    
     cmd = [
         sys.executable, "-m", "grpc_tools.protoc",
         f"--proto_path={proto_dir}",
@@ -36,14 +47,14 @@ def generate_proto():
     ]
     
     try:
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+        result = subprocess.run(cmd, check=True, capture_output=True)
         print("Successfully generated Python gRPC bindings")
         print(f"Generated files in {output_dir}/")
         return True
     except subprocess.CalledProcessError as e:
         print(f"Error generating protobuf files: {e}")
-        print(f"stdout: {e.stdout}")
-        print(f"stderr: {e.stderr}")
+        print(f"stdout: {e.stdout.decode(errors='replace')}")
+        print(f"stderr: {e.stderr.decode(errors='replace')}")
         return False
 
 if __name__ == "__main__":
@@ -1,4 +1,6 @@
+import asyncio
 import grpc
+from grpc import aio
 from concurrent import futures
 import logging
 import os
@@ -6,15 +8,38 @@ from dotenv import load_dotenv
 
 from proto import ai_analysis_pb2_grpc
 from proto import ai_analysis_pb2
-from core.log_preprocessor import LogPreprocessor
 from core.llm_analyzer import LLMAnalyzer
 
-# Load environment variables
-load_dotenv()
+_LOG_FIELDS = ('id', 'timestamp', 'level', 'message', 'source', 'metadata')
+
+# LLM结果缺失时的降级文案，按级别预先生成，各日志共享只读元组
+_FALLBACK_ROOT_CAUSES = {
+    level: (f"🤖 LLM分析: {level}级别日志",)
+    for level in ('DEBUG', 'INFO', 'WARN', 'WARNING', 'ERROR', 'FATAL', 'CRITICAL')
+}
+_FALLBACK_RECOMMENDATIONS = ("🔍 建议查看详细日志信息",)
+
+class _LogView:
+    """protobuf LogEntry 的只读字典视图，按需读取字段，避免逐条复制成dict"""
+    __slots__ = ('_p',)
+
+    def __init__(self, p):
+        self._p = p
+
+    def __getitem__(self, key):
+        if key not in _LOG_FIELDS:
+            raise KeyError(key)
+        return getattr(self._p, key)
+
+    def get(self, key, default=None):
+        return getattr(self._p, key) if key in _LOG_FIELDS else default
+
+    def copy(self) -> dict:
+        # 需要可写副本时才物化
+        return {key: getattr(self._p, key) for key in _LOG_FIELDS}
 
 class AIAnalysisService(ai_analysis_pb2_grpc.AIAnalysisServiceServicer):
     def __init__(self):
-        self.preprocessor = LogPreprocessor()
         # 只使用LLM分析器，移除传统ML组件
         self.llm_analyzer = LLMAnalyzer()
         
@@ -26,80 +51,134 @@ class AIAnalysisService(ai_analysis_pb2_grpc.AIAnalysisServiceServicer):
         try:
             logging.info(f"Received LLM analysis request for {len(request.logs)} logs")
             
-            # Convert protobuf logs to internal format
-            logs = []
-            for log_entry in request.logs:
-                logs.append({
-                    'id': log_entry.id,
-                    'timestamp': log_entry.timestamp,
-                    'level': log_entry.level,
-                    'message': log_entry.message,
-                    'source': log_entry.source,
-                    'metadata': dict(log_entry.metadata)
-                })
-            
-            # 基础预处理（保留，用于提供上下文信息）
-            processed_logs = self.preprocessor.process(logs)
+            # 直接包装protobuf日志，metadata 保持为原生 map
+            logs = [_LogView(log_entry) for log_entry in request.logs]
             
             # 使用LLM进行综合分析
             logging.info("Performing comprehensive LLM analysis for all logs")
             batch_analysis = self.llm_analyzer.analyze_logs_batch(logs, None)
             
-            # 构建分析结果
-            results = []
-            individual_results = batch_analysis.get('individual_results', [])
-            
-            for i, log in enumerate(logs):
-                # 从LLM分析结果中提取信息
-                if i < len(individual_results):
-                    individual = individual_results[i]
-                    is_anomaly = individual.get('is_anomaly', False)
-                    anomaly_score = individual.get('anomaly_score', 0.0)
-                    root_causes = individual.get('root_causes', [])
-                    recommendations = individual.get('recommendations', [])
-                else:
-                    # 降级处理：基于日志级别的简单判断
-                    is_anomaly = log.get('level', '').upper() in ['ERROR', 'FATAL', 'CRITICAL']
-                    anomaly_score = 0.8 if is_anomaly else 0.1
-                    root_causes = [f"🤖 LLM分析: {log.get('level', 'INFO')}级别日志"]
-                    recommendations = ["🔍 建议查看详细日志信息"]
-                
-                # 添加批量分析的总结信息到第一个结果
-                if i == 0 and batch_analysis.get('summary'):
-                    root_causes.insert(0, f"📊 整体分析: {batch_analysis['summary']}")
-                    
-                    if batch_analysis.get('key_findings'):
-                        findings_str = ', '.join(batch_analysis['key_findings'][:3])
-                        recommendations.insert(0, f"🔍 关键发现: {findings_str}")
-                
-                result = ai_analysis_pb2.AnalysisResult(
-                    log_id=log['id'],
-                    is_anomaly=is_anomaly,
-                    anomaly_score=anomaly_score,
-                    root_causes=root_causes,
-                    recommendations=recommendations
-                )
-                results.append(result)
+            return self._build_response(logs, batch_analysis)
             
-            logging.info(f"LLM analysis completed for {len(logs)} logs")
+        except Exception as e:
+            return self._error_response(e)
+
+    def _build_response(self, logs, batch_analysis):
+        """根据LLM批量分析结果构建gRPC响应"""
+        # 构建分析结果，直接在响应的 repeated 字段上原地添加
+        response = ai_analysis_pb2.LogAnalysisResponse(status="success", error_message="")
+        individual_results = batch_analysis.get('individual_results', [])
+        
+        # 批量分析的总结信息只加在第一个结果前，循环外预先拼好
+        summary_prefix = None
+        findings_prefix = None
+        if batch_analysis.get('summary'):
+            summary_prefix = f"📊 整体分析: {batch_analysis['summary']}"
+            if batch_analysis.get('key_findings'):
+                findings_str = ', '.join(batch_analysis['key_findings'][:3])
+                findings_prefix = f"🔍 关键发现: {findings_str}"
+        
+        for i, log in enumerate(logs):
+            # 从LLM分析结果中提取信息
+            if i < len(individual_results):
+                individual = individual_results[i]
+                is_anomaly = individual.get('is_anomaly', False)
+                anomaly_score = individual.get('anomaly_score', 0.0)
+                root_causes = individual.get('root_causes', [])
+                recommendations = individual.get('recommendations', [])
+            else:
+                # 降级处理：基于日志级别的简单判断
+                level = log.get('level', 'INFO')
+                is_anomaly = log.get('level', '').upper() in ['ERROR', 'FATAL', 'CRITICAL']
+                anomaly_score = 0.8 if is_anomaly else 0.1
+                root_causes = _FALLBACK_ROOT_CAUSES.get(level) or (f"🤖 LLM分析: {level}级别日志",)
+                recommendations = _FALLBACK_RECOMMENDATIONS
             
-            return ai_analysis_pb2.LogAnalysisResponse(
-                results=results,
-                status="success",
-                error_message=""
+            result = response.results.add(
+                log_id=log['id'],
+                is_anomaly=is_anomaly,
+                anomaly_score=anomaly_score
             )
             
+            # 添加批量分析的总结信息到第一个结果
+            if i == 0 and summary_prefix is not None:
+                result.root_causes.append(summary_prefix)
+                if findings_prefix is not None:
+                    result.recommendations.append(findings_prefix)
+            
+            result.root_causes.extend(root_causes)
+            result.recommendations.extend(recommendations)
+        
+        logging.info(f"LLM analysis completed for {len(logs)} logs")
+        
+        return response
+
+    def _error_response(self, e):
+        """构建分析失败的gRPC响应"""
+        logging.error(f"Error in LLM analysis: {str(e)}")
+        return ai_analysis_pb2.LogAnalysisResponse(
+            results=[],
+            status="error",
+            error_message=f"LLM analysis failed: {str(e)}"
+        )
+
+class AsyncAIAnalysisService(AIAnalysisService):
+    """grpc.aio 版本的分析服务，LLM调用期间不占用线程"""
+
+    async def AnalyzeLogs(self, request, context):
+        try:
+            logging.info(f"Received LLM analysis request for {len(request.logs)} logs")
+            
+            logs = [_LogView(log_entry) for log_entry in request.logs]
+            batch_analysis = await self.llm_analyzer.analyze_logs_batch_async(logs, None)
+            
+            return self._build_response(logs, batch_analysis)
+            
         except Exception as e:
-            logging.error(f"Error in LLM analysis: {str(e)}")
-            return ai_analysis_pb2.LogAnalysisResponse(
-                results=[],
-                status="error",
-                error_message=f"LLM analysis failed: {str(e)}"
-            )
+            return self._error_response(e)
+
+_SERVER_OPTIONS = [
+    ('grpc.max_receive_message_length', 64 * 1024 * 1024),
+    ('grpc.max_send_message_length', 64 * 1024 * 1024),
+    ('grpc.so_reuseport', 1),
+    ('grpc.keepalive_time_ms', 30000),
+    # Go客户端每30秒无流ping一次，放宽服务端限制避免 too_many_pings
+    ('grpc.keepalive_permit_without_calls', 1),
+    ('grpc.http2.min_ping_interval_without_data_ms', 20000),
+]
+
+async def serve_async(port):
+    """单事件循环承载全部并发请求"""
+    server = aio.server(compression=grpc.Compression.Gzip, options=_SERVER_OPTIONS)
+    ai_analysis_pb2_grpc.add_AIAnalysisServiceServicer_to_server(
+        AsyncAIAnalysisService(), server
+    )
+    
+    listen_addr = f'[::]:{port}'
+    server.add_insecure_port(listen_addr)
+    
+    logging.info(f"Starting async Pure LLM AI Analysis Service on {listen_addr}")
+    await server.start()
+    await server.wait_for_termination()
 
 def serve():
+    """启动gRPC服务；加载 .env 并初始化日志配置（仅在此处产生这些副作用）"""
+    # Load environment variables
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    
     port = os.getenv('AI_SERVICE_PORT', '50051')
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    if os.getenv('AI_SERVICE_ASYNC') == '1':
+        asyncio.run(serve_async(port))
+        return
+    
+    # LLM调用以I/O等待为主，线程数按CPU放大；日志文本重复度高，默认gzip压缩
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        compression=grpc.Compression.Gzip,
+        options=_SERVER_OPTIONS,
+    )
     ai_analysis_pb2_grpc.add_AIAnalysisServiceServicer_to_server(
         AIAnalysisService(), server
     )
@@ -112,5 +191,4 @@ def serve():
     server.wait_for_termination()
 
 if __name__ == '__main__':
-    logging.basicConfig(level=logging.INFO)
     serve()
\ No newline at end of file
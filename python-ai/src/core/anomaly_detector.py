@@ -1,11 +1,123 @@
 import numpy as np
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import logging
+import threading
+from collections import deque
+from itertools import chain
+from operator import itemgetter
 import joblib
+from joblib import parallel_backend
 import os
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+try:
+    import lz4  # noqa: F401  joblib 的 lz4 压缩依赖该模块
+    _MODEL_COMPRESS = ('lz4', 3)
+except ImportError:
+    _MODEL_COMPRESS = 3
+
+_ERROR_LEVELS = frozenset({'ERROR', 'FATAL', 'CRITICAL'})
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _normalize_scores_numba(scores):
+        """单个内核完成反转、归一化和截断"""
+        mn = scores.min()
+        mx = scores.max()
+        if mn == mx:
+            return np.zeros_like(scores)
+        inv = 1.0 / (mx - mn)
+        out = np.empty_like(scores)
+        for i in prange(scores.shape[0]):
+            v = (mx - scores[i]) * inv
+            out[i] = 0.0 if v < 0.0 else (1.0 if v > 1.0 else v)
+        return out
+else:
+    _normalize_scores_numba = None
+
+# 每 N 次训练才落盘一次（首次训练总会保存）
+_SAVE_EVERY_N_FITS = 10
+
+# 样本攒够后才训练，小批次训练出的模型质量差；缓冲区只保留最近的样本
+_MIN_FIT_SAMPLES = 500
+_PENDING_MAXLEN = 10_000
+
+# 规则2: 严重错误关键词
+_CRITICAL_KEYWORDS = (
+    'panic', 'crash', 'segmentation fault', 'out of memory',
+    'connection refused', 'timeout', 'failed', 'exception',
+    'critical', 'fatal', 'abort', 'denied'
+)
+
+# 规则5: 频繁出现的错误模式
+_FREQUENT_ERROR_PATTERNS = (
+    'connection refused',
+    'timeout',
+    'out of memory',
+    'segmentation fault',
+    'null pointer',
+    'stack overflow',
+    'access denied',
+    'permission denied',
+    'file not found',
+    'network unreachable'
+)
+
+# 机器学习特征列，顺序即特征矩阵的列顺序
+_ML_FEATURE_KEYS = (
+    # 原有特征
+    'message_length',
+    'word_count',
+    'level_numeric',
+    'has_error_keywords',
+    'has_warning_keywords',
+    'has_numbers',
+    'has_special_chars',
+    'source_hash',
+    # 新增特征
+    'critical_keyword_count',
+    'error_pattern_score',
+    'stack_trace_indicator',
+    'is_error_level',
+    'message_entropy',
+)
+
+# 一次 C 调用取出全部特征值；缺失特征按 0 补齐
+_ML_FEATURE_GETTER = itemgetter(*_ML_FEATURE_KEYS)
+_ML_FEATURE_DEFAULTS = dict.fromkeys(_ML_FEATURE_KEYS, 0)
+
+def _ml_feature_row(features: Dict[str, Any]) -> Tuple:
+    """按 _ML_FEATURE_KEYS 顺序返回单条日志的特征值"""
+    try:
+        return _ML_FEATURE_GETTER(features)
+    except KeyError:
+        return _ML_FEATURE_GETTER({**_ML_FEATURE_DEFAULTS, **features})
+
+_EMPTY_FEATURES: Dict[str, Any] = {}
+
+_CRITICAL_KEYWORD_SET = frozenset(_CRITICAL_KEYWORDS)
+_FREQUENT_ERROR_PATTERN_SET = frozenset(_FREQUENT_ERROR_PATTERNS)
+
+# 规则2与规则5的关键词合并为一个自动机，每条消息只扫描一遍
+_RULE_AUTOMATON = None
+if ahocorasick is not None:
+    _RULE_AUTOMATON = ahocorasick.Automaton()
+    for _word in _CRITICAL_KEYWORD_SET | _FREQUENT_ERROR_PATTERN_SET:
+        _RULE_AUTOMATON.add_word(_word, _word)
+    _RULE_AUTOMATON.make_automaton()
+    del _word
+
 class AnomalyDetector:
     """改进的异常检测器 - 混合机器学习和规则引擎"""
     
@@ -14,10 +126,17 @@ class AnomalyDetector:
         self.model = IsolationForest(
             contamination=contamination,
             random_state=42,
-            n_estimators=100
+            n_estimators=100,
+            n_jobs=-1  # 各棵树的训练与打分分摊到全部核心
         )
         self.scaler = StandardScaler()
         self.is_fitted = False
+        self._rule_ac = _RULE_AUTOMATON
+        self._fit_counter = 0
+        self._pending = deque(maxlen=_PENDING_MAXLEN)
+        self._min_fit = _MIN_FIT_SAMPLES
+        self._fit_lock = threading.Lock()
+        self._fit_thread = None
         self.model_path = model_path or os.path.join(os.path.dirname(__file__), '../../models')
         
         # Create models directory if it doesn't exist
@@ -48,63 +167,70 @@ class AnomalyDetector:
             return self._get_default_results(len(processed_logs))
     
     def _rule_based_detection(self, processed_logs: List[Dict[str, Any]]) -> Dict[str, List]:
-        """基于规则的异常检测"""
-        is_anomaly = []
-        scores = []
+        """基于规则的异常检测（按列向量化，规则按优先级依次生效）"""
+        if not processed_logs:
+            return {'is_anomaly': [], 'scores': []}
         
+        n = len(processed_logs)
+        # 单次遍历取出各列，每条日志的 features 只查找一次，append 绑定为局部变量
+        level_list, messages, error_flags, lengths = [], [], [], []
+        append_level = level_list.append
+        append_message = messages.append
+        append_flag = error_flags.append
+        append_length = lengths.append
         for log in processed_logs:
-            features = log.get('features', {})
-            original_log = log  # 原始日志数据
-            
-            level = original_log.get('level', '').upper()
-            message = original_log.get('message', '').lower()
-            
+            f = log.get('features') or _EMPTY_FEATURES
+            append_level(log.get('level', '').upper())
+            append_message(log.get('message', '').lower())
+            append_flag(f.get('has_error_keywords', False))
+            append_length(f.get('message_length', 0))
+        
+        levels = np.array(level_list)
+        # 集合哈希查找，省去 np.isin 对整列的排序
+        error_levels = np.fromiter((level in _ERROR_LEVELS for level in level_list), dtype=bool, count=n)
+        has_error_keywords = np.array(error_flags, dtype=bool)
+        message_lengths = np.array(lengths, dtype=np.float64)
+        
+        critical_hits, frequent_hits = self._keyword_hits(messages)
+        
+        conditions = [
             # 规则1: ERROR/FATAL/CRITICAL级别自动标记为异常
-            if level in ['ERROR', 'FATAL', 'CRITICAL']:
-                is_anomaly.append(True)
-                scores.append(0.8)  # 高异常分数
-                continue
-            
-            # 规则2: 包含严重错误关键词
-            critical_keywords = [
-                'panic', 'crash', 'segmentation fault', 'out of memory',
-                'connection refused', 'timeout', 'failed', 'exception',
-                'critical', 'fatal', 'abort', 'denied'
-            ]
-            
-            critical_score = 0
-            for keyword in critical_keywords:
-                if keyword in message:
-                    critical_score += 0.2
-            
-            if critical_score >= 0.4:  # 包含2个或更多关键词
-                is_anomaly.append(True)
-                scores.append(min(0.9, 0.5 + critical_score))
-                continue
-            
+            error_levels,
+            # 规则2: 包含2个或更多严重错误关键词，min(0.9, 0.5 + 0.2 * 命中数) 恒为0.9
+            critical_hits >= 2,
             # 规则3: WARN级别 + 错误关键词
-            if level == 'WARN' and features.get('has_error_keywords', False):
-                is_anomaly.append(True)
-                scores.append(0.6)
-                continue
-            
+            (levels == 'WARN') & has_error_keywords,
             # 规则4: 异常长的消息（可能是堆栈跟踪）
-            if features.get('message_length', 0) > 1000:
-                is_anomaly.append(True)
-                scores.append(0.5)
-                continue
-            
+            message_lengths > 1000,
             # 规则5: 频繁出现的错误模式
-            if self._is_frequent_error_pattern(message):
-                is_anomaly.append(True)
-                scores.append(0.7)
-                continue
-            
-            # 默认为正常
-            is_anomaly.append(False)
-            scores.append(0.1)
+            frequent_hits,
+        ]
+        scores = np.select(conditions, [0.8, 0.9, 0.6, 0.5, 0.7], default=0.1)
+        is_anomaly = np.logical_or.reduce(conditions)
         
-        return {'is_anomaly': is_anomaly, 'scores': scores}
+        return {'is_anomaly': is_anomaly.tolist(), 'scores': scores.tolist()}
+    
+    def _keyword_hits(self, messages: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """统计每条（已小写）消息命中的严重关键词数，以及是否命中频繁错误模式"""
+        n = len(messages)
+        if self._rule_ac is None:
+            # 未安装 pyahocorasick 时按关键词逐个列扫描，命中矩阵 (K, N)
+            column = np.array(messages)
+            critical_hits = np.add.reduce(
+                [np.char.find(column, kw) >= 0 for kw in _CRITICAL_KEYWORDS], axis=0)
+            frequent_hits = np.logical_or.reduce(
+                [np.char.find(column, p) >= 0 for p in _FREQUENT_ERROR_PATTERNS], axis=0)
+            return critical_hits, frequent_hits
+        
+        critical_hits = np.zeros(n, dtype=np.int64)
+        frequent_hits = np.zeros(n, dtype=bool)
+        ac_iter = self._rule_ac.iter
+        for i, message in enumerate(messages):
+            hits = {word for _, word in ac_iter(message)}
+            if hits:
+                critical_hits[i] = len(hits & _CRITICAL_KEYWORD_SET)
+                frequent_hits[i] = not hits.isdisjoint(_FREQUENT_ERROR_PATTERN_SET)
+        return critical_hits, frequent_hits
     
     def _ml_based_detection(self, processed_logs: List[Dict[str, Any]]) -> Dict[str, List]:
         """基于机器学习的异常检测"""
@@ -116,16 +242,17 @@ class AnomalyDetector:
                 logging.warning("No features extracted for ML detection")
                 return self._get_default_results(len(processed_logs))
             
-            # If model is not fitted, fit it with current data
+            # If model is not fitted, 缓存样本并在后台训练，期间仅由规则引擎给出结果
             if not self.is_fitted:
-                self._fit_model(features)
+                self._schedule_fit(features)
+                return self._get_default_results(len(processed_logs))
             
-            # Predict anomalies
-            predictions = self.model.predict(features)
-            scores = self.model.score_samples(features)
+            # Predict anomalies; 线程后端同样作用于从磁盘加载、未设置 n_jobs 的旧模型
+            with parallel_backend('threading', n_jobs=-1):
+                scores = self.model.score_samples(features)
             
-            # Convert predictions (-1 for anomaly, 1 for normal) to boolean
-            is_anomaly = [pred == -1 for pred in predictions]
+            # predict() 即 score_samples - offset_ < 0，直接由分数得出，避免再遍历一次所有树
+            is_anomaly = (scores < self.model.offset_).tolist()
             
             # Normalize scores to [0, 1] range (higher = more anomalous)
             normalized_scores = self._normalize_scores(scores)
@@ -141,89 +268,57 @@ class AnomalyDetector:
     
     def _combine_results(self, rule_results: Dict[str, List], ml_results: Dict[str, List]) -> Dict[str, List]:
         """组合规则和机器学习的结果"""
-        combined_is_anomaly = []
-        combined_scores = []
-        
-        for i in range(len(rule_results['is_anomaly'])):
-            rule_anomaly = rule_results['is_anomaly'][i]
-            rule_score = rule_results['scores'][i]
-            
-            ml_anomaly = ml_results['is_anomaly'][i] if i < len(ml_results['is_anomaly']) else False
-            ml_score = ml_results['scores'][i] if i < len(ml_results['scores']) else 0.0
-            
-            # 规则检测优先级更高
-            if rule_anomaly:
-                combined_is_anomaly.append(True)
-                combined_scores.append(max(rule_score, ml_score))
-            elif ml_anomaly and ml_score > 0.7:  # 只有高置信度的ML结果才采用
-                combined_is_anomaly.append(True)
-                combined_scores.append(ml_score)
-            else:
-                combined_is_anomaly.append(False)
-                combined_scores.append(min(rule_score, ml_score))
-        
+        rule_anomaly = np.asarray(rule_results['is_anomaly'], dtype=bool)
+        rule_score = np.asarray(rule_results['scores'], dtype=np.float64)
+        n = len(rule_anomaly)
+
+        # ML 结果不足时按 False / 0.0 补齐，多余的截断
+        ml_anomaly = np.zeros(n, dtype=bool)
+        ml_score = np.zeros(n, dtype=np.float64)
+        m = min(n, len(ml_results['is_anomaly']))
+        ml_anomaly[:m] = ml_results['is_anomaly'][:m]
+        m = min(n, len(ml_results['scores']))
+        ml_score[:m] = ml_results['scores'][:m]
+
+        # 规则检测优先级更高；只有高置信度的ML结果才采用
+        high_ml = ml_anomaly & (ml_score > 0.7)
+        combined_is_anomaly = rule_anomaly | high_ml
+        combined_scores = np.where(rule_anomaly, np.maximum(rule_score, ml_score),
+                                   np.where(high_ml, ml_score, np.minimum(rule_score, ml_score)))
+
         return {
-            'is_anomaly': combined_is_anomaly,
-            'scores': combined_scores
+            'is_anomaly': combined_is_anomaly.tolist(),
+            'scores': combined_scores.tolist()
         }
     
     def _extract_enhanced_ml_features(self, processed_logs: List[Dict[str, Any]]) -> np.ndarray:
-        """提取增强的机器学习特征"""
-        features_list = []
-        
-        for log in processed_logs:
-            log_features = log.get('features', {})
-            
-            # 原有特征
-            feature_vector = [
-                log_features.get('message_length', 0),
-                log_features.get('word_count', 0),
-                log_features.get('level_numeric', 0),
-                int(log_features.get('has_error_keywords', False)),
-                int(log_features.get('has_warning_keywords', False)),
-                int(log_features.get('has_numbers', False)),
-                int(log_features.get('has_special_chars', False)),
-                log_features.get('source_hash', 0),
-            ]
-            
-            # 新增特征
-            feature_vector.extend([
-                log_features.get('critical_keyword_count', 0),
-                log_features.get('error_pattern_score', 0),
-                log_features.get('stack_trace_indicator', 0),
-                int(log_features.get('is_error_level', False)),
-                log_features.get('message_entropy', 0),
-            ])
-            
-            features_list.append(feature_vector)
-        
-        if not features_list:
+        """提取增强的机器学习特征（float32 矩阵，按行一次取出全部特征）"""
+        n = len(processed_logs)
+        if n == 0:
             return np.array([])
-            
-        features = np.array(features_list)
+        
+        k = len(_ML_FEATURE_KEYS)
+        # 布尔特征写入时即转为 0/1
+        rows = map(_ml_feature_row, (log.get('features', {}) for log in processed_logs))
+        features = np.fromiter(chain.from_iterable(rows), dtype=np.float32, count=n * k).reshape(n, k)
         
         # Handle any NaN or infinite values
-        features = np.nan_to_num(features, nan=0.0, posinf=0.0, neginf=0.0)
+        np.nan_to_num(features, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
         
         return features
     
-    def _is_frequent_error_pattern(self, message: str) -> bool:
-        """检查是否是频繁出现的错误模式"""
-        error_patterns = [
-            'connection refused',
-            'timeout',
-            'out of memory',
-            'segmentation fault',
-            'null pointer',
-            'stack overflow',
-            'access denied',
-            'permission denied',
-            'file not found',
-            'network unreachable'
-        ]
-        
-        message_lower = message.lower()
-        return any(pattern in message_lower for pattern in error_patterns)
+    def _schedule_fit(self, features: np.ndarray):
+        """累积训练样本，达到阈值后在后台线程中训练，不阻塞请求线程"""
+        with self._fit_lock:
+            self._pending.extend(features)
+            if len(self._pending) < self._min_fit:
+                return
+            if self._fit_thread is not None and self._fit_thread.is_alive():
+                return
+            samples = np.vstack(self._pending)
+            self._pending.clear()
+            self._fit_thread = threading.Thread(target=self._fit_model, args=(samples,), daemon=True)
+            self._fit_thread.start()
     
     def _fit_model(self, features: np.ndarray):
         """训练模型"""
@@ -233,14 +328,17 @@ class AnomalyDetector:
                 return
                 
             # Scale features
-            scaled_features = self.scaler.fit_transform(features)
+            # 树模型内部按 float32 遍历，训练数据保持 float32 以免 sklearn 再复制一份
+            scaled_features = self.scaler.fit_transform(features).astype(np.float32, copy=False)
             
             # Fit the isolation forest
             self.model.fit(scaled_features)
             self.is_fitted = True
             
-            # Save the model
-            self._save_model()
+            # Save the model; 只在首次及之后每 N 次训练时落盘
+            self._fit_counter += 1
+            if (self._fit_counter - 1) % _SAVE_EVERY_N_FITS == 0:
+                self._save_model()
             
             logging.info(f"Enhanced model fitted with {len(features)} samples")
             
@@ -251,6 +349,9 @@ class AnomalyDetector:
         """标准化异常分数到 [0, 1] 范围"""
         if len(scores) == 0:
             return np.array([])
+
+        if _normalize_scores_numba is not None:
+            return _normalize_scores_numba(np.ascontiguousarray(scores, dtype=np.float64))
             
         # Isolation Forest scores are typically negative
         # More negative = more anomalous
@@ -278,8 +379,11 @@ class AnomalyDetector:
             model_file = os.path.join(self.model_path, 'enhanced_anomaly_model.joblib')
             scaler_file = os.path.join(self.model_path, 'enhanced_scaler.joblib')
             
-            joblib.dump(self.model, model_file)
-            joblib.dump(self.scaler, scaler_file)
+            # 先写临时文件再原子替换，避免并发保存或中途失败留下损坏的模型文件
+            for obj, path in ((self.model, model_file), (self.scaler, scaler_file)):
+                tmp_file = f"{path}.{os.getpid()}.tmp"
+                joblib.dump(obj, tmp_file, compress=_MODEL_COMPRESS)
+                os.replace(tmp_file, path)
             
             logging.info(f"Enhanced model saved to {model_file}")
             
@@ -1,11 +1,72 @@
 import os
+import re
+import asyncio
 import json
+import orjson
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import httpx
 import time
-from typing import List, Dict, Any, Optional
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterator
 from datetime import datetime
 
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+# 响应中第一个 '{' 到最后一个 '}' 之间的内容
+_JSON_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+# 流式解析时定位 individual_results 数组的起点
+_RESULTS_START_RE = re.compile(r'"individual_results"\s*:\s*\[')
+_JSON_DECODER = json.JSONDecoder()
+
+# 计算缓存键前抹去时间戳，仅时间不同的批次共享同一条缓存
+_TIMESTAMP_RE = re.compile(
+    r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?'
+)
+_MEMORY_CACHE_SIZE = 256
+_PROMPT_CACHE_SIZE = 512
+
+_ERROR_LEVELS = frozenset({'ERROR', 'FATAL', 'CRITICAL'})
+
+# 共享 Session 的连接池上限与 gRPC 线程池大小一致（见 ai_service.serve），
+# 否则并发超出部分的连接用完即被丢弃，失去复用效果
+_HTTP_POOL_MAXSIZE = int(os.getenv('LLM_HTTP_POOL_MAXSIZE', min(32, (os.cpu_count() or 1) * 4)))
+
+# 提示词中嵌入的日志 JSON；特征向量对模型无意义，只会浪费 token
+_PROMPT_JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+_PROMPT_DROP_FIELDS = frozenset({'features'})
+
+def _dumps_prompt_json(data: Any) -> str:
+    """以 orjson 生成带缩进的 JSON 文本，输出格式与 json.dumps(indent=2) 一致"""
+    return orjson.dumps(data, option=_PROMPT_JSON_OPTIONS).decode()
+
+def _extract_json(response: str) -> Optional[Dict[str, Any]]:
+    """从大模型响应中提取JSON对象；没有 '{' 时返回 None，解析失败抛出 JSONDecodeError"""
+    # 模型直接返回纯JSON时无需再定位
+    try:
+        result = orjson.loads(response)
+        if isinstance(result, dict):
+            return result
+    except orjson.JSONDecodeError:
+        pass
+    
+    match = _JSON_RE.search(response)
+    if match is None:
+        if '{' in response:
+            raise json.JSONDecodeError("Unterminated JSON object", response, response.find('{'))
+        return None
+    # orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，调用方的异常处理不变
+    return orjson.loads(match.group(0))
+
 class LLMAnalyzer:
     """大模型分析器 - 使用SiliconFlow API进行深度日志分析"""
     
@@ -13,6 +74,45 @@ class LLMAnalyzer:
         self.api_url = "https://api.siliconflow.cn/v1/chat/completions"
         self.api_token = os.getenv('SILICONFLOW_API_TOKEN')
         self.model = "Qwen/QwQ-32B"
+        self._headers = {
+            'Authorization': f'Bearer {self.api_token}',
+            'Content-Type': 'application/json'
+        }
+        # 复用 keep-alive 连接，避免每次调用重新进行 TLS 握手；
+        # 建连失败和网关类 5xx 由 urllib3 退避重试，重试耗尽后返回最后一次响应；
+        # 读超时不重试：POST 非幂等，重发会重复计费，且单次调用已可能耗时 120 秒
+        self._session = requests.Session()
+        self._session.headers.update(self._headers)
+        self._session.mount('https://', HTTPAdapter(
+            pool_connections=4, pool_maxsize=_HTTP_POOL_MAXSIZE,
+            max_retries=Retry(
+                total=None,
+                connect=3,
+                read=0,
+                status=3,
+                backoff_factor=0.5,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=frozenset(['POST']),
+                raise_on_status=False
+            )
+        ))
+        # grpc.aio 服务使用的异步客户端，首次调用时在事件循环内创建；
+        # 只适用于单一事件循环，analyze_log_shards 每次调用使用自己的客户端
+        self._async_client = None
+        
+        # 按提示词哈希缓存大模型原始响应：进程内LRU + 可选的跨进程磁盘缓存
+        self._memory_cache = OrderedDict()
+        # 轮询场景下相同的前15条日志会反复出现，按字段元组缓存已构建的提示词
+        self._comprehensive_prompt_cached = functools.lru_cache(maxsize=_PROMPT_CACHE_SIZE)(
+            self._build_comprehensive_prompt_from_key)
+        self._cache_lock = threading.Lock()
+        self._disk_cache = None
+        if diskcache is not None:
+            cache_dir = os.getenv('LLM_CACHE_DIR', '/tmp/llm_cache')
+            try:
+                self._disk_cache = diskcache.Cache(cache_dir, size_limit=1 << 30)
+            except Exception as e:
+                logging.warning(f"LLM disk cache unavailable at {cache_dir}: {str(e)}")
         
         if not self.api_token:
             logging.warning("SILICONFLOW_API_TOKEN not found in environment variables")
@@ -27,18 +127,107 @@ class LLMAnalyzer:
             # 构建综合分析提示词
             prompt = self._build_comprehensive_analysis_prompt(logs)
             
-            # 调用大模型API
-            response = self._call_llm_api(prompt)
+            # 调用大模型API（命中缓存时跳过）
+            key = self._cache_key(prompt)
+            response = self._get_cached_response(key)
+            cached = response is not None
+            if not cached:
+                response = self._call_llm_api(prompt)
             
-            if response:
-                return self._parse_comprehensive_response(response, logs)
-            else:
+            result = self._parse_comprehensive_response(response, logs) if response else None
+            if result is None:
+                return self._get_default_comprehensive_analysis(logs)
+            # 只缓存可解析的响应，避免无法解析的回复被永久复用
+            if not cached:
+                self._store_response(key, response)
+            return result
+                
+        except Exception as e:
+            logging.warning(f"LLM comprehensive analysis failed, using fallback: {str(e)}")
+            return self._get_default_comprehensive_analysis(logs)
+    
+    async def analyze_logs_batch_async(self, logs: List[Dict[str, Any]], anomaly_results: Dict[str, List] = None,
+                                       client: Optional[httpx.AsyncClient] = None) -> Dict[str, Any]:
+        """analyze_logs_batch 的异步版本，等待大模型时不占用线程；client 为空时使用共享客户端"""
+        if not self.api_token:
+            logging.info("LLM analysis skipped: API token not configured")
+            return self._get_default_comprehensive_analysis(logs)
+        
+        try:
+            prompt = self._build_comprehensive_analysis_prompt(logs)
+            key = self._cache_key(prompt)
+            # 磁盘缓存读写放到线程中，不阻塞事件循环
+            response = await asyncio.to_thread(self._get_cached_response, key)
+            cached = response is not None
+            if not cached:
+                response = await self._call_llm_api_async(prompt, client)
+            
+            result = self._parse_comprehensive_response(response, logs) if response else None
+            if result is None:
                 return self._get_default_comprehensive_analysis(logs)
+            if not cached:
+                await asyncio.to_thread(self._store_response, key, response)
+            return result
                 
         except Exception as e:
             logging.warning(f"LLM comprehensive analysis failed, using fallback: {str(e)}")
             return self._get_default_comprehensive_analysis(logs)
     
+    async def analyze_log_shards_async(self, log_batches: List[List[Dict[str, Any]]],
+                                       client: Optional[httpx.AsyncClient] = None) -> List[Dict[str, Any]]:
+        """并发分析多个日志分片，结果顺序与输入一致"""
+        return await asyncio.gather(*[self.analyze_logs_batch_async(logs, None, client) for logs in log_batches])
+    
+    def analyze_log_shards(self, log_batches: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """analyze_log_shards_async 的同步包装，供线程池模式的调用方使用"""
+        async def run():
+            # 每次调用都有独立的事件循环，客户端随循环创建和关闭，不与其他线程共享
+            async with self._new_async_client() as client:
+                return await self.analyze_log_shards_async(log_batches, client)
+        return asyncio.run(run())
+    
+    def iter_individual_results(self, logs: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """流式综合分析：individual_results 中每个对象一生成完整就立即产出，缺失部分以默认结果补齐"""
+        if not self.api_token:
+            logging.info("LLM analysis skipped: API token not configured")
+            yield from self._get_default_comprehensive_analysis(logs)['individual_results']
+            return
+        
+        count = 0
+        try:
+            prompt = self._build_comprehensive_analysis_prompt(logs)
+            buffer = ''
+            pos = None
+            for delta in self._call_llm_api(prompt, stream=True):
+                buffer += delta
+                if pos is None:
+                    match = _RESULTS_START_RE.search(buffer)
+                    if match is None:
+                        continue
+                    pos = match.end()
+                
+                # 逐个弹出已完整的数组元素，未完整的留待后续增量
+                while True:
+                    while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                        pos += 1
+                    if pos >= len(buffer) or buffer[pos] == ']':
+                        break
+                    try:
+                        item, pos = _JSON_DECODER.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        break
+                    yield item
+                    count += 1
+                
+                if pos < len(buffer) and buffer[pos] == ']':
+                    break
+                    
+        except Exception as e:
+            logging.warning(f"LLM streaming analysis failed, using fallback: {str(e)}")
+        
+        for i in range(count, len(logs)):
+            yield self._default_individual_result(i, logs[i])
+    
     def analyze_single_log(self, log: Dict[str, Any], context_logs: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         """分析单个日志条目"""
         if not self.api_token:
@@ -74,7 +263,7 @@ class LLMAnalyzer:
             
             if anomaly_results['is_anomaly'][i] if i < len(anomaly_results['is_anomaly']) else False:
                 anomalies.append(log_data)
-            elif log.get('level', '').upper() in ['ERROR', 'FATAL', 'CRITICAL']:
+            elif log.get('level', '').upper() in _ERROR_LEVELS:
                 error_logs.append(log_data)
             else:
                 normal_logs.append(log_data)
@@ -98,13 +287,13 @@ class LLMAnalyzer:
 - 异常率: {data['anomaly_rate']:.2%}
 
 ## 异常日志样本
-{json.dumps(data['anomalies'], ensure_ascii=False, indent=2)}
+{_dumps_prompt_json(data['anomalies'])}
 
 ## 错误日志样本
-{json.dumps(data['error_logs'], ensure_ascii=False, indent=2)}
+{_dumps_prompt_json(data['error_logs'])}
 
 ## 正常日志样本
-{json.dumps(data['normal_logs'], ensure_ascii=False, indent=2)}
+{_dumps_prompt_json(data['normal_logs'])}
 
 请提供以下分析结果（请用JSON格式回复）：
 {{
@@ -122,16 +311,20 @@ class LLMAnalyzer:
         
         return prompt
     
+    def _trim_prompt_log(self, log: Dict[str, Any]) -> Dict[str, Any]:
+        """去掉提示词中不需要的字段"""
+        return {k: v for k, v in log.items() if k not in _PROMPT_DROP_FIELDS}
+    
     def _build_single_log_prompt(self, log: Dict[str, Any], context_logs: List[Dict[str, Any]] = None) -> str:
         """构建单个日志分析提示词"""
         context_info = ""
         if context_logs:
-            context_info = f"\n## 上下文日志\n{json.dumps(context_logs[-5:], ensure_ascii=False, indent=2)}"
+            context_info = f"\n## 上下文日志\n{_dumps_prompt_json([self._trim_prompt_log(l) for l in context_logs[-5:]])}"
         
         prompt = f"""你是一个专业的日志分析专家。请分析以下单个日志条目：
 
 ## 目标日志
-{json.dumps(log, ensure_ascii=False, indent=2)}
+{_dumps_prompt_json(self._trim_prompt_log(log))}
 {context_info}
 
 请提供以下分析结果（请用JSON格式回复）：
@@ -147,51 +340,30 @@ class LLMAnalyzer:
         
         return prompt
     
-    def _call_llm_api(self, prompt: str) -> Optional[str]:
-        """调用大模型API"""
+    def _call_llm_api(self, prompt: str, stream: bool = False) -> Optional[str]:
+        """调用大模型API；stream=True 时返回逐段产出内容增量的生成器"""
+        if stream:
+            return self._call_llm_api_stream(prompt)
+        
         try:
             logging.info(f"Starting LLM API call to {self.api_url}")
             logging.debug(f"Using model: {self.model}")
             logging.debug(f"Prompt length: {len(prompt)} characters")
             
-            headers = {
-                'Authorization': f'Bearer {self.api_token[:10]}...',  # 只显示token前10位用于调试
-                'Content-Type': 'application/json'
-            }
-            
-            data = {
-                "model": self.model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "stream": False,
-                "temperature": 0.1,  # 降低随机性，提高分析的一致性
-                "max_tokens": 2000
-            }
+            data = self._build_request_data(prompt)
             
             logging.info("Sending request to LLM API...")
             start_time = time.time()
             
-            response = requests.post(
-                self.api_url,
-                headers={
-                    'Authorization': f'Bearer {self.api_token}',
-                    'Content-Type': 'application/json'
-                },
-                json=data,
-                timeout=120
-            )
+            response = self._session.post(self.api_url, data=orjson.dumps(data), timeout=120)
             
             elapsed_time = time.time() - start_time
             logging.info(f"LLM API response received in {elapsed_time:.2f} seconds")
             logging.info(f"Response status code: {response.status_code}")
             
             if response.status_code == 200:
-                result = response.json()
-                content = result['choices'][0]['message']['content']
+                # 直接解析原始字节，跳过字符集探测和标准库 json
+                content = orjson.loads(response.content)['choices'][0]['message']['content']
                 logging.info(f"LLM API call successful, response length: {len(content)} characters")
                 logging.debug(f"Response preview: {content[:200]}...")
                 return content
@@ -215,16 +387,134 @@ class LLMAnalyzer:
             logging.error(f"Error type: {type(e).__name__}")
             return None
     
+    def _call_llm_api_stream(self, prompt: str) -> Iterator[str]:
+        """以SSE流式调用大模型API，逐段产出 content 增量"""
+        data = self._build_request_data(prompt)
+        data['stream'] = True
+        
+        logging.info(f"Starting streaming LLM API call to {self.api_url}")
+        with self._session.post(self.api_url, data=orjson.dumps(data), timeout=120, stream=True) as response:
+            if response.status_code != 200:
+                logging.error(f"LLM API error: {response.status_code} - {response.text}")
+                return
+            
+            # 按字节处理，避免 text/event-stream 缺省字符集导致中文被错误解码
+            for line in response.iter_lines():
+                if not line.startswith(b'data:'):
+                    continue
+                payload = line[5:].strip()
+                if payload == b'[DONE]':
+                    break
+                choices = orjson.loads(payload).get('choices') or [{}]
+                content = (choices[0].get('delta') or {}).get('content')
+                if content:
+                    yield content
+    
+    def _new_async_client(self) -> httpx.AsyncClient:
+        """创建异步客户端；须在将要使用它的事件循环内调用"""
+        return httpx.AsyncClient(
+            http2=True,
+            timeout=120,
+            limits=httpx.Limits(max_connections=8, max_keepalive_connections=8)
+        )
+    
+    async def _call_llm_api_async(self, prompt: str, client: Optional[httpx.AsyncClient] = None) -> Optional[str]:
+        """异步调用大模型API；未传入 client 时复用共享 httpx.AsyncClient 的连接池"""
+        try:
+            if client is None:
+                if self._async_client is None:
+                    self._async_client = self._new_async_client()
+                client = self._async_client
+            
+            logging.info(f"Starting async LLM API call to {self.api_url}")
+            start_time = time.time()
+            
+            response = await client.post(
+                self.api_url,
+                headers=self._headers,
+                content=orjson.dumps(self._build_request_data(prompt))
+            )
+            
+            elapsed_time = time.time() - start_time
+            logging.info(f"LLM API response received in {elapsed_time:.2f} seconds")
+            
+            if response.status_code == 200:
+                content = orjson.loads(response.content)['choices'][0]['message']['content']
+                logging.info(f"LLM API call successful, response length: {len(content)} characters")
+                return content
+            else:
+                logging.error(f"LLM API error: {response.status_code} - {response.text}")
+                return None
+                
+        except httpx.TimeoutException as e:
+            logging.error(f"LLM API timeout after 120 seconds: {str(e)}")
+            return None
+        except httpx.HTTPError as e:
+            logging.error(f"LLM API request error: {str(e)}")
+            return None
+        except Exception as e:
+            logging.error(f"Unexpected error calling LLM API: {str(e)}")
+            logging.error(f"Error type: {type(e).__name__}")
+            return None
+    
+    def _cache_key(self, prompt: str) -> bytes:
+        """缓存键：模型名 + 去除时间戳后的提示词的 SHA-256"""
+        normalized = _TIMESTAMP_RE.sub('<TS>', prompt)
+        return hashlib.sha256(f"{self.model}\n{normalized}".encode('utf-8')).digest()
+    
+    def _get_cached_response(self, key: bytes) -> Optional[str]:
+        """先查进程内LRU，再查磁盘缓存"""
+        with self._cache_lock:
+            response = self._memory_cache.get(key)
+            if response is not None:
+                self._memory_cache.move_to_end(key)
+                return response
+        
+        if self._disk_cache is not None:
+            response = self._disk_cache.get(key)
+            if response is not None:
+                self._remember(key, response)
+                return response
+        return None
+    
+    def _store_response(self, key: bytes, response: str):
+        """写入进程内LRU与磁盘缓存"""
+        self._remember(key, response)
+        if self._disk_cache is not None:
+            try:
+                self._disk_cache.set(key, response)
+            except Exception as e:
+                logging.warning(f"Failed to write LLM disk cache: {str(e)}")
+    
+    def _remember(self, key: bytes, response: str):
+        with self._cache_lock:
+            self._memory_cache[key] = response
+            self._memory_cache.move_to_end(key)
+            if len(self._memory_cache) > _MEMORY_CACHE_SIZE:
+                self._memory_cache.popitem(last=False)
+    
+    def _build_request_data(self, prompt: str) -> Dict[str, Any]:
+        """构建大模型请求体"""
+        return {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "stream": False,
+            "temperature": 0.1,  # 降低随机性，提高分析的一致性
+            "max_tokens": 2000
+        }
+    
     def _parse_llm_response(self, response: str) -> Dict[str, Any]:
         """解析大模型响应"""
         try:
             # 尝试提取JSON部分
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = response[start_idx:end_idx]
-                return json.loads(json_str)
+            result = _extract_json(response)
+            if result is not None:
+                return result
             else:
                 # 如果没有找到JSON，返回文本分析
                 return {
@@ -244,12 +534,9 @@ class LLMAnalyzer:
     def _parse_single_log_response(self, response: str) -> Dict[str, Any]:
         """解析单个日志的大模型响应"""
         try:
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = response[start_idx:end_idx]
-                return json.loads(json_str)
+            result = _extract_json(response)
+            if result is not None:
+                return result
             else:
                 return {
                     "severity": "MEDIUM",
@@ -290,20 +577,27 @@ class LLMAnalyzer:
         }
     def _build_comprehensive_analysis_prompt(self, logs: List[Dict[str, Any]]) -> str:
         """构建优化的综合分析提示词，提升分析准确性"""
-        logs_data = []
-        for i, log in enumerate(logs[:15]):  # 适当减少数量，提升分析质量
-            logs_data.append({
-                'index': i,
-                'timestamp': log.get('timestamp', ''),
-                'level': log.get('level', ''),
-                'message': log.get('message', ''),
-                'source': log.get('source', '')
-            })
+        key = tuple(
+            (log.get('timestamp', ''), log.get('level', ''), log.get('message', ''), log.get('source', ''))
+            for log in logs[:15]  # 适当减少数量，提升分析质量
+        )
+        try:
+            return self._comprehensive_prompt_cached(key)
+        except TypeError:
+            # 字段值不可哈希时直接构建
+            return self._build_comprehensive_prompt_from_key(key)
+    
+    def _build_comprehensive_prompt_from_key(self, key: tuple) -> str:
+        """由 (timestamp, level, message, source) 元组构建综合分析提示词"""
+        logs_data = [
+            {'index': i, 'timestamp': timestamp, 'level': level, 'message': message, 'source': source}
+            for i, (timestamp, level, message, source) in enumerate(key)
+        ]
         
         prompt = f"""你是一个资深的系统运维和日志分析专家，拥有丰富的故障诊断经验。请对以下日志进行专业的综合分析。
 
 ## 日志数据
-{json.dumps(logs_data, ensure_ascii=False, indent=2)}
+{_dumps_prompt_json(logs_data)}
 
 ## 分析要求
 请为每个日志提供精准的分析，并给出整体评估。重点关注：
@@ -350,63 +644,61 @@ class LLMAnalyzer:
         
         return prompt
 
-    def _parse_comprehensive_response(self, response: str, logs: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """解析综合分析响应"""
+    def _parse_comprehensive_response(self, response: str, logs: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """解析综合分析响应；无法解析时返回 None，由调用方回退到默认结果"""
         try:
             # 尝试提取JSON部分
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = response[start_idx:end_idx]
-                result = json.loads(json_str)
-            else:
+            result = _extract_json(response)
+            if result is None:
                 raise json.JSONDecodeError("No JSON found", response, 0)
             
             # 确保individual_results的数量与输入日志匹配
             individual_results = result.get('individual_results', [])
             while len(individual_results) < len(logs):
                 # 为缺失的日志添加默认分析结果
-                log = logs[len(individual_results)]
-                default_result = {
-                    "index": len(individual_results),
-                    "is_anomaly": log.get('level', '').upper() in ['ERROR', 'FATAL', 'CRITICAL'],
-                    "anomaly_score": 0.8 if log.get('level', '').upper() in ['ERROR', 'FATAL', 'CRITICAL'] else 0.1,
-                    "root_causes": [f"🤖 {log.get('level', 'INFO')}级别日志"],
-                    "recommendations": ["🔍 建议查看详细信息"],
-                    "severity": "HIGH" if log.get('level', '').upper() in ['ERROR', 'FATAL', 'CRITICAL'] else "LOW"
-                }
-                individual_results.append(default_result)
+                index = len(individual_results)
+                individual_results.append(self._default_individual_result(index, logs[index]))
             
             result['individual_results'] = individual_results
             return result
             
         except json.JSONDecodeError as e:
             logging.warning(f"Failed to parse LLM response as JSON: {e}")
-            return self._get_default_comprehensive_analysis(logs)
+            return None
         except Exception as e:
             logging.warning(f"Error parsing comprehensive response: {e}")
-            return self._get_default_comprehensive_analysis(logs)
+            return None
+
+    def _default_individual_result(self, index: int, log: Dict[str, Any]) -> Dict[str, Any]:
+        """LLM未返回某条日志的结果时，按日志级别生成默认结果"""
+        is_error = log.get('level', '').upper() in _ERROR_LEVELS
+        return {
+            "index": index,
+            "is_anomaly": is_error,
+            "anomaly_score": 0.8 if is_error else 0.1,
+            "root_causes": [f"🤖 {log.get('level', 'INFO')}级别日志"],
+            "recommendations": ["🔍 建议查看详细信息"],
+            "severity": "HIGH" if is_error else "LOW"
+        }
 
     def _get_default_comprehensive_analysis(self, logs: List[Dict[str, Any]]) -> Dict[str, Any]:
         """获取默认的综合分析结果"""
-        individual_results = []
-        anomaly_count = 0
+        # 级别只大写一次，异常标记与计数共用
+        levels = [log.get('level', '').upper() for log in logs]
+        flags = [level in _ERROR_LEVELS for level in levels]
+        anomaly_count = sum(flags)
         
-        for i, log in enumerate(logs):
-            level = log.get('level', '').upper()
-            is_anomaly = level in ['ERROR', 'FATAL', 'CRITICAL']
-            if is_anomaly:
-                anomaly_count += 1
-            
-            individual_results.append({
+        individual_results = [
+            {
                 "index": i,
                 "is_anomaly": is_anomaly,
                 "anomaly_score": 0.8 if is_anomaly else 0.1,
                 "root_causes": [f"📊 传统分析: {level}级别日志"],
                 "recommendations": ["🔍 建议进一步分析"] if is_anomaly else ["✅ 日志正常"],
                 "severity": "HIGH" if is_anomaly else "LOW"
-            })
+            }
+            for i, (level, is_anomaly) in enumerate(zip(levels, flags))
+        ]
         
         return {
             "individual_results": individual_results,
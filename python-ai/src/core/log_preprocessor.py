@@ -1,32 +1,324 @@
 import re
-import pandas as pd
 from datetime import datetime
 from typing import List, Dict, Any
 import logging
 import math
+import zlib
+import functools
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+_COMMON_PATTERNS = [
+    r'\d{4}-\d{2}-\d{2}',  # Date patterns
+    r'\d{2}:\d{2}:\d{2}',  # Time patterns
+    r'\b\d+\.\d+\.\d+\.\d+\b',  # IP addresses
+    r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',  # Email addresses
+    r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b',  # UUIDs
+]
+
+# 预编译的正则，热路径上直接调用，省去 re 模块的缓存查找
+_WHITESPACE_RE = re.compile(r'\s+')
+_CONTROL_CHARS_RE = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+_CONTROL_CHARS_TABLE = str.maketrans('', '', ''.join(map(chr, [*range(0x00, 0x20), *range(0x7f, 0xa0)])))
+_NUMBER_RE = re.compile(r'\d+')
+_SPECIAL_CHARS_RE = re.compile(r'[!@#$%^&*(),.?":{}|<>]')
+_IP_RE = re.compile(r'\b\d+\.\d+\.\d+\.\d+\b')
+_TIME_RE = re.compile(r'\d{2}:\d{2}:\d{2}')
+# 每个通用模式必然包含的字面字符；消息中没有该字符时跳过这个模式。
+# 合并成一个交替式在标准库 re 中反而更慢（失去了各模式的前缀优化）
+_PATTERN_REQUIRED_CHARS = ['-', ':', '.', '@', '-']
+_PATTERN_FINDERS = [
+    (char, re.compile(p).findall) for char, p in zip(_PATTERN_REQUIRED_CHARS, _COMMON_PATTERNS)
+]
+
+# Hyperscan 多模式数据库：一次线性扫描得出哪些正则在消息中出现。
+# 编号 0-4 对应 _COMMON_PATTERNS，其后依次为数字、特殊字符、IP、时间。
+# Hyperscan 的 \b、\d 只按 ASCII 语义匹配，因此只用于 ASCII 消息，此时与 re 的结果一致
+_HS_NUMBER_ID, _HS_SPECIAL_ID, _HS_IP_ID, _HS_TIME_ID = range(len(_COMMON_PATTERNS), len(_COMMON_PATTERNS) + 4)
+_HS_DATABASE = None
+if hyperscan is not None:
+    try:
+        _hs_expressions = [*_COMMON_PATTERNS, _NUMBER_RE.pattern, _SPECIAL_CHARS_RE.pattern, _IP_RE.pattern, _TIME_RE.pattern]
+        _HS_DATABASE = hyperscan.Database()
+        _HS_DATABASE.compile(
+            expressions=[p.encode() for p in _hs_expressions],
+            ids=list(range(len(_hs_expressions))),
+            flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(_hs_expressions)
+        )
+        del _hs_expressions
+    except Exception as e:
+        logging.warning(f"Hyperscan database unavailable, using re: {str(e)}")
+        _HS_DATABASE = None
+
+# Hyperscan 的 scratch 不能在线程间共享，每个线程各持一份
+_HS_LOCAL = threading.local()
+
+def _hs_collect(pattern_id, start, end, flags, hits):
+    """Hyperscan 匹配回调：记录命中的模式编号"""
+    hits.add(pattern_id)
+
+# 扩展的错误关键词
+_CRITICAL_KEYWORDS = [
+    'panic', 'crash', 'segmentation fault', 'out of memory',
+    'connection refused', 'timeout', 'failed', 'exception',
+    'critical', 'fatal', 'abort', 'denied', 'null pointer',
+    'stack overflow', 'access denied', 'permission denied'
+]
+
+# 错误模式及其权重
+_ERROR_PATTERN_WEIGHTS = {
+    'connection': 0.3,
+    'timeout': 0.4,
+    'failed': 0.2,
+    'error': 0.1,
+    'exception': 0.3,
+    'crash': 0.5,
+    'panic': 0.6,
+    'fatal': 0.5,
+    'critical': 0.4,
+}
+
+_STACK_INDICATORS = [
+    'at ', 'in ', 'line ', 'file ', '.java:', '.py:', '.cpp:',
+    'stacktrace', 'traceback', 'caused by'
+]
+
+_ERROR_KEYWORDS = [
+    'error', 'exception', 'failed', 'failure', 'crash', 'fatal',
+    'critical', 'panic', 'abort', 'timeout', 'refused', 'denied',
+    'null pointer', 'segmentation fault', 'out of memory', 'stack overflow'
+]
+
+_WARNING_KEYWORDS = [
+    'warning', 'warn', 'deprecated', 'slow', 'retry', 'fallback',
+    'degraded', 'limited', 'throttled', 'temporary', 'disabled'
+]
+
+# 日志级别数值（增加权重差异），键均为大写
+_LEVEL_MAP = {
+    'DEBUG': 1,
+    'INFO': 2,
+    'WARN': 4,      # 增加权重
+    'WARNING': 4,
+    'ERROR': 8,     # 显著增加权重
+    'FATAL': 10,    # 最高权重
+    'CRITICAL': 10,
+}
+_ERROR_LEVELS = frozenset({'ERROR', 'FATAL', 'CRITICAL'})
+
+# 支持的时间戳格式
+_TIMESTAMP_FORMATS = (
+    '%Y-%m-%dT%H:%M:%S.%fZ',
+    '%Y-%m-%dT%H:%M:%SZ',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+)
+
+# 与上述格式完全对应的 ISO 形状，可直接交给 C 实现的 fromisoformat 解析
+_ISO_TIMESTAMP_RE = re.compile(
+    r'[0-9]{4}-[0-9]{2}-[0-9]{2}'
+    r'(?:T[0-9]{2}:[0-9]{2}:[0-9]{2}(?:\.[0-9]{1,6})?Z| [0-9]{2}:[0-9]{2}:[0-9]{2}(?:\.[0-9]{1,6})?)'
+)
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _ascii_stats_kernel(buf):
+        """单次遍历 ASCII 字节：累计直方图与大写/数字计数，并就地计算熵"""
+        n = buf.shape[0]
+        hist = np.zeros(128, dtype=np.int64)
+        upper = 0
+        digits = 0
+        for i in range(n):
+            c = buf[i]
+            hist[c] += 1
+            if 65 <= c <= 90:
+                upper += 1
+            elif 48 <= c <= 57:
+                digits += 1
+        entropy = 0.0
+        for c in range(128):
+            if hist[c] > 0:
+                p = hist[c] / n
+                entropy -= p * np.log2(p)
+        return entropy, upper / n, digits / n
+else:
+    _ascii_stats_kernel = None
+
+# 不同字符数达到该值时改用 NumPy 计算熵；字符种类少时逐项计算反而更快
+_VECTOR_ENTROPY_MIN_UNIQUE = 128
+
+_CRITICAL_KEYWORD_SET = frozenset(_CRITICAL_KEYWORDS)
+_STACK_INDICATOR_SET = frozenset(_STACK_INDICATORS)
+_ERROR_KEYWORD_SET = frozenset(_ERROR_KEYWORDS)
+_WARNING_KEYWORD_SET = frozenset(_WARNING_KEYWORDS)
+
+# 五类关键词合并为一个 Aho-Corasick 自动机，每条消息只线性扫描一遍
+_ALL_KEYWORDS = tuple(dict.fromkeys([
+    *_CRITICAL_KEYWORDS, *_ERROR_PATTERN_WEIGHTS, *_STACK_INDICATORS,
+    *_ERROR_KEYWORDS, *_WARNING_KEYWORDS
+]))
+_KEYWORD_AUTOMATON = None
+if ahocorasick is not None:
+    _KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for _keyword in _ALL_KEYWORDS:
+        _KEYWORD_AUTOMATON.add_word(_keyword, _keyword)
+    _KEYWORD_AUTOMATON.make_automaton()
+    del _keyword
+
+# 特征的固定结构：字段顺序即特征字典的键顺序，供批量特征矩阵使用。
+# 布尔特征用 '?'，小范围计数用无符号整型，[0,1] 区间的分数与比例用 float16
+FEATURE_DTYPE = np.dtype([
+    # 原有特征
+    ('message_length', 'i4'),
+    ('word_count', 'i4'),
+    ('level_numeric', 'u1'),
+    ('has_error_keywords', '?'),
+    ('has_warning_keywords', '?'),
+    ('has_numbers', '?'),
+    ('has_special_chars', '?'),
+    ('source_hash', 'u2'),             # [0, 1000)
+    # 新增增强特征
+    ('critical_keyword_count', 'u1'),  # 最多16个关键词
+    ('error_pattern_score', 'f2'),
+    ('stack_trace_indicator', 'f2'),
+    ('is_error_level', '?'),
+    ('message_entropy', 'f2'),
+    ('has_ip_address', '?'),
+    ('has_timestamp', '?'),
+    ('uppercase_ratio', 'f2'),
+    ('numeric_ratio', 'f2'),
+])
+_FEATURE_NAMES = FEATURE_DTYPE.names
+
+def features_to_dict(row: np.void) -> Dict[str, Any]:
+    """将 FEATURE_DTYPE 的一行还原为特征字典（Python 原生类型）"""
+    return dict(zip(_FEATURE_NAMES, row.item()))
+
+@functools.lru_cache(maxsize=4096)
+def _source_hash(source: str) -> int:
+    """来源编码：CRC32 跨进程稳定（内置 hash 受 PYTHONHASHSEED 影响），来源种类少，结果缓存"""
+    return zlib.crc32(str(source).encode('utf-8', 'surrogatepass')) % 1000
+
+# 特征缓存容量：心跳、健康检查等重复日志只需计算一次
+_FEATURE_CACHE_SIZE = 65536
+
+# 批次达到该规模时才分发到进程池，小批次的进程间传输开销大于收益
+_PARALLEL_MIN_BATCH = 1000
+
+# 工作进程内的预处理器，首次处理分块时创建，之后复用
+_worker_preprocessor = None
+
+def _process_chunk(logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """进程池工作函数：在工作进程内串行处理一个分块"""
+    global _worker_preprocessor
+    if _worker_preprocessor is None:
+        _worker_preprocessor = LogPreprocessor()
+    return _worker_preprocessor.process(logs)
 
 class LogPreprocessor:
     """改进的日志预处理器 - 增强特征提取"""
     
-    def __init__(self):
-        self.common_patterns = [
-            r'\d{4}-\d{2}-\d{2}',  # Date patterns
-            r'\d{2}:\d{2}:\d{2}',  # Time patterns
-            r'\b\d+\.\d+\.\d+\.\d+\b',  # IP addresses
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',  # Email addresses
-            r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b',  # UUIDs
-        ]
+    def __init__(self, n_workers: int = 0):
+        # n_workers > 1 时大批次由进程池并行处理
+        self.n_workers = n_workers
+        self._pool = None
+        self.common_patterns = _COMMON_PATTERNS
+        self._ws_re = _WHITESPACE_RE
+        self._ctrl_re = _CONTROL_CHARS_RE
+        self._ctrl_table = _CONTROL_CHARS_TABLE
+        self._num_re = _NUMBER_RE
+        self._special_re = _SPECIAL_CHARS_RE
+        self._ip_re = _IP_RE
+        self._time_re = _TIME_RE
+        self._pattern_finders = _PATTERN_FINDERS
+        self._hs_db = _HS_DATABASE
         
         # 扩展的错误关键词
-        self.critical_keywords = [
-            'panic', 'crash', 'segmentation fault', 'out of memory',
-            'connection refused', 'timeout', 'failed', 'exception',
-            'critical', 'fatal', 'abort', 'denied', 'null pointer',
-            'stack overflow', 'access denied', 'permission denied'
-        ]
+        self.critical_keywords = _CRITICAL_KEYWORDS
+        self._kw_ac = _KEYWORD_AUTOMATON
+        
+        # 预先触发 JIT 编译（或加载缓存），避免首个批次承担编译耗时
+        if _ascii_stats_kernel is not None:
+            _ascii_stats_kernel(np.frombuffer(b'warm up', dtype=np.uint8))
+        
+        # 特征只取决于 (message, level, source)，按实例缓存计算结果
+        self._feature_values_cached = functools.lru_cache(maxsize=_FEATURE_CACHE_SIZE)(self._compute_feature_values)
+        
+        # 同一日志流的时间戳格式基本固定，记住上次成功的格式优先尝试
+        self._last_fmt = None
         
     def process(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """处理日志列表，返回预处理后的日志"""
+        if self.n_workers > 1 and len(logs) >= _PARALLEL_MIN_BATCH:
+            try:
+                return self._process_parallel(logs)
+            except Exception as e:
+                logging.warning(f"Parallel log preprocessing failed, falling back to serial: {str(e)}")
+        
+        try:
+            return self._process_batch(logs)
+        except Exception:
+            # 批量路径中任一日志出错时逐条处理，只有出错的日志退化为最小处理
+            return self._process_each(logs)
+    
+    def _process_parallel(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按分块分发到进程池，每个工作进程约处理4个分块"""
+        if self._pool is None:
+            # spawn 启动的工作进程不继承 gRPC 等服务线程的状态
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        
+        chunk_size = max(1, len(logs) // (self.n_workers * 4))
+        chunks = [logs[i:i + chunk_size] for i in range(0, len(logs), chunk_size)]
+        
+        processed_logs = []
+        for processed_chunk in self._pool.map(_process_chunk, chunks):
+            processed_logs.extend(processed_chunk)
+        return processed_logs
+    
+    def close(self):
+        """关闭进程池"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+    
+    def _process_batch(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按列批量处理：每一步都对整列调用同一个方法，最后再按行组装"""
+        messages = [log['message'] for log in logs]
+        timestamps = [log['timestamp'] for log in logs]
+        
+        cleaned_messages = list(map(self._clean_message, messages))
+        features = list(map(self._extract_enhanced_features, logs))
+        normalized_timestamps = list(map(self._normalize_timestamp, timestamps))
+        patterns = list(map(self._extract_patterns, messages))
+        
+        return [
+            {**log, 'cleaned_message': c, 'features': f, 'normalized_timestamp': t, 'patterns': p}
+            for log, c, f, t, p in zip(logs, cleaned_messages, features, normalized_timestamps, patterns)
+        ]
+    
+    def _process_each(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """逐条处理日志，单条失败时返回最小处理结果"""
         processed_logs = []
         
         for log in logs:
@@ -64,104 +356,162 @@ class LogPreprocessor:
             return ""
             
         # Remove extra whitespace
-        cleaned = re.sub(r'\s+', ' ', message.strip())
+        cleaned = self._ws_re.sub(' ', message.strip())
         
-        # Remove control characters
-        cleaned = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', cleaned)
+        # Remove control characters; 控制字符均不可打印，可打印的消息无需处理。
+        # str.translate 在 ASCII 字符串上有快速路径，其余情况正则更快
+        if not cleaned.isprintable():
+            if cleaned.isascii():
+                cleaned = cleaned.translate(self._ctrl_table)
+            else:
+                cleaned = self._ctrl_re.sub('', cleaned)
         
         return cleaned
     
+    def process_to_array(self, logs: List[Dict[str, Any]]) -> np.ndarray:
+        """批量提取特征，返回 FEATURE_DTYPE 结构化数组（每条日志一行，连续内存）"""
+        try:
+            return np.fromiter(map(self._feature_values, logs), dtype=FEATURE_DTYPE, count=len(logs))
+        except Exception:
+            # 逐条处理，出错的日志按最小处理结果填充，缺失字段为 0
+            features = np.zeros(len(logs), dtype=FEATURE_DTYPE)
+            for i, log in enumerate(logs):
+                try:
+                    features[i] = self._feature_values(log)
+                except Exception as e:
+                    logging.warning(f"Failed to process log {log.get('id', 'unknown')}: {str(e)}")
+                    fallback = self._create_fallback_log(log)['features']
+                    features[i] = tuple(fallback.get(name, 0) for name in _FEATURE_NAMES)
+            return features
+    
     def _extract_enhanced_features(self, log: Dict[str, Any]) -> Dict[str, Any]:
         """提取增强的日志特征"""
+        return dict(zip(_FEATURE_NAMES, self._feature_values(log)))
+    
+    def _feature_values(self, log: Dict[str, Any]) -> tuple:
+        """按 FEATURE_DTYPE 字段顺序返回特征值"""
         message = log.get('message', '')
         level = log.get('level', '').upper()
         source = log.get('source', '')
+        try:
+            return self._feature_values_cached(message, level, source)
+        except TypeError:
+            # 字段值不可哈希时直接计算
+            return self._compute_feature_values(message, level, source)
+    
+    def _compute_feature_values(self, message: str, level: str, source: Any) -> tuple:
+        """计算特征值（level 已转为大写）"""
+        if not message:
+            # 空消息的内容特征全部为 0，只有级别与来源相关的特征需要计算
+            return (0, 0, self._level_to_numeric(level, already_upper=True), False, False, False, False,
+                    _source_hash(source), 0, 0.0, 0.0, level in _ERROR_LEVELS, 0.0, False, False, 0.0, 0.0)
         
-        # 原有特征
-        features = {
-            'message_length': len(message),
-            'word_count': len(message.split()) if message else 0,
-            'level_numeric': self._level_to_numeric(level),
-            'has_error_keywords': self._has_error_keywords(message),
-            'has_warning_keywords': self._has_warning_keywords(message),
-            'has_numbers': bool(re.search(r'\d+', message)),
-            'has_special_chars': bool(re.search(r'[!@#$%^&*(),.?":{}|<>]', message)),
-            'source_hash': hash(source) % 1000,  # Simple source encoding
-        }
+        # 字符直方图只统计一遍，熵、大写比例、数字比例都由它推导
+        message_entropy, uppercase_ratio, numeric_ratio = self._character_stats(message)
+        # 消息只转一次小写；关键词同样只扫描一遍，各类关键词特征由命中集合推导
+        message_lower = message.lower()
+        keyword_hits = self._keyword_hits(message_lower)
+        regex_hits = self._regex_hits(message)
+        if regex_hits is not None:
+            has_numbers = _HS_NUMBER_ID in regex_hits
+            has_special_chars = _HS_SPECIAL_ID in regex_hits
+            has_ip_address = _HS_IP_ID in regex_hits
+            has_timestamp = _HS_TIME_ID in regex_hits
+        else:
+            has_numbers = bool(self._num_re.search(message))
+            has_special_chars = bool(self._special_re.search(message))
+            has_ip_address = bool(self._ip_re.search(message))
+            has_timestamp = bool(self._time_re.search(message))
         
-        # 新增增强特征
-        features.update({
-            'critical_keyword_count': self._count_critical_keywords(message),
-            'error_pattern_score': self._calculate_error_pattern_score(message),
-            'stack_trace_indicator': self._detect_stack_trace(message),
-            'is_error_level': level in ['ERROR', 'FATAL', 'CRITICAL'],
-            'message_entropy': self._calculate_message_entropy(message),
-            'has_ip_address': bool(re.search(r'\b\d+\.\d+\.\d+\.\d+\b', message)),
-            'has_timestamp': bool(re.search(r'\d{2}:\d{2}:\d{2}', message)),
-            'uppercase_ratio': self._calculate_uppercase_ratio(message),
-            'numeric_ratio': self._calculate_numeric_ratio(message),
-        })
-        
-        return features
+        return (
+            # 原有特征
+            len(message),
+            len(message.split()) if message else 0,
+            self._level_to_numeric(level, already_upper=True),
+            self._has_error_keywords(keyword_hits),
+            self._has_warning_keywords(keyword_hits),
+            has_numbers,
+            has_special_chars,
+            _source_hash(source),  # Simple source encoding
+            # 新增增强特征
+            self._count_critical_keywords(keyword_hits),
+            self._calculate_error_pattern_score(keyword_hits),
+            self._detect_stack_trace(keyword_hits),
+            level in _ERROR_LEVELS,
+            message_entropy,
+            has_ip_address,
+            has_timestamp,
+            uppercase_ratio,
+            numeric_ratio,
+        )
+    
+    def _keyword_hits(self, message_lower: str) -> set:
+        """返回已小写的消息中出现过的全部关键词"""
+        if self._kw_ac is not None:
+            return {keyword for _, keyword in self._kw_ac.iter(message_lower)}
+        return {keyword for keyword in _ALL_KEYWORDS if keyword in message_lower}
     
-    def _count_critical_keywords(self, message: str) -> int:
+    def _count_critical_keywords(self, keyword_hits: set) -> int:
         """统计关键错误关键词数量"""
-        message_lower = message.lower()
-        count = 0
-        for keyword in self.critical_keywords:
-            if keyword in message_lower:
-                count += 1
-        return count
+        return len(keyword_hits & _CRITICAL_KEYWORD_SET)
     
-    def _calculate_error_pattern_score(self, message: str) -> float:
+    def _calculate_error_pattern_score(self, keyword_hits: set) -> float:
         """计算错误模式分数"""
-        message_lower = message.lower()
         score = 0.0
         
         # 检查各种错误模式
-        error_patterns = {
-            'connection': 0.3,
-            'timeout': 0.4,
-            'failed': 0.2,
-            'error': 0.1,
-            'exception': 0.3,
-            'crash': 0.5,
-            'panic': 0.6,
-            'fatal': 0.5,
-            'critical': 0.4,
-        }
-        
-        for pattern, weight in error_patterns.items():
-            if pattern in message_lower:
+        for pattern, weight in _ERROR_PATTERN_WEIGHTS.items():
+            if pattern in keyword_hits:
                 score += weight
         
         return min(score, 1.0)  # 限制在[0,1]范围内
     
-    def _detect_stack_trace(self, message: str) -> float:
+    def _detect_stack_trace(self, keyword_hits: set) -> float:
         """检测堆栈跟踪指示器"""
-        stack_indicators = [
-            'at ', 'in ', 'line ', 'file ', '.java:', '.py:', '.cpp:',
-            'stacktrace', 'traceback', 'caused by'
-        ]
-        
-        message_lower = message.lower()
-        indicator_count = sum(1 for indicator in stack_indicators if indicator in message_lower)
+        indicator_count = len(keyword_hits & _STACK_INDICATOR_SET)
         
         return min(indicator_count / 3.0, 1.0)  # 标准化到[0,1]
     
-    def _calculate_message_entropy(self, message: str) -> float:
-        """计算消息熵（复杂度指标）"""
-        if not message:
-            return 0.0
+    def _character_stats(self, message: str) -> tuple:
+        """返回 (消息熵, 大写字母比例, 数字字符比例)"""
+        message_length = len(message)
+        if not message_length:
+            return 0.0, 0.0, 0.0
+        
+        if message.isascii():
+            if _ascii_stats_kernel is not None:
+                entropy, uppercase_ratio, numeric_ratio = _ascii_stats_kernel(
+                    np.frombuffer(message.encode('ascii'), dtype=np.uint8))
+                return min(entropy / 5.0, 1.0), uppercase_ratio, numeric_ratio
+            
+            # ASCII 消息：一次 bincount 得到字节直方图，大写/数字直接按码位区间求和
+            hist = np.bincount(np.frombuffer(message.encode('ascii'), dtype=np.uint8), minlength=128)
+            probabilities = hist[hist > 0] / message_length
+            entropy = float(-(probabilities * np.log2(probabilities)).sum())
+            uppercase_count = int(hist[65:91].sum())   # 'A'-'Z'
+            numeric_count = int(hist[48:58].sum())     # '0'-'9'
+            return min(entropy / 5.0, 1.0), uppercase_count / message_length, numeric_count / message_length
         
-        # 计算字符频率
-        char_counts = {}
-        for char in message:
-            char_counts[char] = char_counts.get(char, 0) + 1
+        char_counts = Counter(message)
+        return (
+            self._calculate_message_entropy(char_counts, message_length),
+            self._calculate_uppercase_ratio(char_counts, message_length),
+            self._calculate_numeric_ratio(char_counts, message_length),
+        )
+    
+    def _calculate_message_entropy(self, char_counts: Counter, message_length: int) -> float:
+        """由字符频率计算消息熵（复杂度指标）"""
+        if not message_length:
+            return 0.0
         
         # 计算熵
+        if len(char_counts) >= _VECTOR_ENTROPY_MIN_UNIQUE:
+            probabilities = np.fromiter(char_counts.values(), dtype=np.float64, count=len(char_counts))
+            probabilities /= message_length
+            entropy = float(-(probabilities * np.log2(probabilities)).sum())
+            return min(entropy / 5.0, 1.0)
+        
         entropy = 0.0
-        message_length = len(message)
         
         for count in char_counts.values():
             probability = count / message_length
@@ -171,36 +521,45 @@ class LogPreprocessor:
         # 标准化熵值（假设最大熵约为5）
         return min(entropy / 5.0, 1.0)
     
-    def _calculate_uppercase_ratio(self, message: str) -> float:
-        """计算大写字母比例"""
-        if not message:
+    def _calculate_uppercase_ratio(self, char_counts: Counter, message_length: int) -> float:
+        """由字符频率计算大写字母比例"""
+        if not message_length:
             return 0.0
         
-        uppercase_count = sum(1 for char in message if char.isupper())
-        return uppercase_count / len(message)
+        uppercase_count = sum(count for char, count in char_counts.items() if char.isupper())
+        return uppercase_count / message_length
     
-    def _calculate_numeric_ratio(self, message: str) -> float:
-        """计算数字字符比例"""
-        if not message:
+    def _calculate_numeric_ratio(self, char_counts: Counter, message_length: int) -> float:
+        """由字符频率计算数字字符比例"""
+        if not message_length:
             return 0.0
         
-        numeric_count = sum(1 for char in message if char.isdigit())
-        return numeric_count / len(message)
+        numeric_count = sum(count for char, count in char_counts.items() if char.isdigit())
+        return numeric_count / message_length
     
     def _normalize_timestamp(self, timestamp_str: str) -> str:
         """标准化时间戳"""
         try:
-            # Try to parse various timestamp formats
-            formats = [
-                '%Y-%m-%dT%H:%M:%S.%fZ',
-                '%Y-%m-%dT%H:%M:%SZ',
-                '%Y-%m-%d %H:%M:%S',
-                '%Y-%m-%d %H:%M:%S.%f',
-            ]
+            if _ISO_TIMESTAMP_RE.fullmatch(timestamp_str):
+                try:
+                    return datetime.fromisoformat(timestamp_str.rstrip('Z')).isoformat()
+                except ValueError:
+                    pass
             
-            for fmt in formats:
+            # Try to parse various timestamp formats, 上次成功的格式优先
+            last_fmt = self._last_fmt
+            if last_fmt is not None:
+                try:
+                    return datetime.strptime(timestamp_str, last_fmt).isoformat()
+                except ValueError:
+                    pass
+            
+            for fmt in _TIMESTAMP_FORMATS:
+                if fmt == last_fmt:
+                    continue
                 try:
                     dt = datetime.strptime(timestamp_str, fmt)
+                    self._last_fmt = fmt
                     return dt.isoformat()
                 except ValueError:
                     continue
@@ -211,48 +570,50 @@ class LogPreprocessor:
         except Exception:
             return timestamp_str
     
+    def _regex_hits(self, message: str):
+        """用 Hyperscan 扫描 ASCII 消息，返回出现的模式编号集合；不可用时返回 None"""
+        if self._hs_db is None or not message.isascii():
+            return None
+        scratch = getattr(_HS_LOCAL, 'scratch', None)
+        if scratch is None:
+            scratch = _HS_LOCAL.scratch = hyperscan.Scratch(self._hs_db)
+        hits = set()
+        self._hs_db.scan(message.encode('ascii'), match_event_handler=_hs_collect, context=hits, scratch=scratch)
+        return hits
+    
     def _extract_patterns(self, message: str) -> List[str]:
         """提取消息中的模式"""
-        patterns = []
+        patterns = None
+        regex_hits = self._regex_hits(message)
         
-        for pattern in self.common_patterns:
-            matches = re.findall(pattern, message)
+        for pattern_id, (required_char, findall) in enumerate(self._pattern_finders):
+            # Hyperscan 已确认未出现的模式直接跳过；否则用字符包含检查（C 层面的 memchr）预筛
+            if regex_hits is not None:
+                if pattern_id not in regex_hits:
+                    continue
+            elif required_char not in message:
+                continue
+            matches = findall(message)
             if matches:
-                patterns.extend(matches)
+                # 通常只有一种模式命中，直接沿用 findall 返回的列表，不再复制
+                if patterns is None:
+                    patterns = matches
+                else:
+                    patterns += matches
                 
-        return patterns
+        return patterns if patterns is not None else []
     
-    def _level_to_numeric(self, level: str) -> int:
-        """将日志级别转换为数值（增加权重差异）"""
-        level_map = {
-            'DEBUG': 1,
-            'INFO': 2,
-            'WARN': 4,      # 增加权重
-            'WARNING': 4,
-            'ERROR': 8,     # 显著增加权重
-            'FATAL': 10,    # 最高权重
-            'CRITICAL': 10,
-        }
-        return level_map.get(level.upper(), 0)
+    def _level_to_numeric(self, level: str, already_upper: bool = False) -> int:
+        """将日志级别转换为数值；调用方已转为大写时跳过 upper()"""
+        return _LEVEL_MAP.get(level if already_upper else level.upper(), 0)
     
-    def _has_error_keywords(self, message: str) -> bool:
+    def _has_error_keywords(self, keyword_hits: set) -> bool:
         """检查是否包含错误关键词（扩展列表）"""
-        error_keywords = [
-            'error', 'exception', 'failed', 'failure', 'crash', 'fatal',
-            'critical', 'panic', 'abort', 'timeout', 'refused', 'denied',
-            'null pointer', 'segmentation fault', 'out of memory', 'stack overflow'
-        ]
-        message_lower = message.lower()
-        return any(keyword in message_lower for keyword in error_keywords)
+        return not keyword_hits.isdisjoint(_ERROR_KEYWORD_SET)
     
-    def _has_warning_keywords(self, message: str) -> bool:
+    def _has_warning_keywords(self, keyword_hits: set) -> bool:
         """检查是否包含警告关键词"""
-        warning_keywords = [
-            'warning', 'warn', 'deprecated', 'slow', 'retry', 'fallback',
-            'degraded', 'limited', 'throttled', 'temporary', 'disabled'
-        ]
-        message_lower = message.lower()
-        return any(keyword in message_lower for keyword in warning_keywords)
+        return not keyword_hits.isdisjoint(_WARNING_KEYWORD_SET)
     
     def _create_fallback_log(self, log: Dict[str, Any]) -> Dict[str, Any]:
         """创建备用的最小处理日志"""
@@ -1,315 +1,563 @@
 import re
-from typing import Dict, List, Any
+import sys
+import functools
+from typing import Dict, List, Any, Tuple, NamedTuple, Optional
 import logging
 
+try:
+    # 第三方 regex 模块处理大型分支结构比标准库 re 更快
+    import regex as _fast_re
+except ImportError:
+    _fast_re = re
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# 错误模式库：每个类别的匹配模式、根因与建议
+_ERROR_PATTERNS = {
+    'database': {
+        'patterns': [
+            r'database.*\w+',
+            r'connection.*timeout',
+            r'database.*not.*available',
+            r'sql.*error',
+            r'deadlock',
+            r'connection.*refused',
+            r'too many connections',
+            r'db.*connection.*failed',
+            r'mysql.*error',
+            r'postgresql.*error',
+            r'oracle.*error',
+            r'sqlite.*error',
+            r'table.*not.*found',
+            r'duplicate.*key',
+            r'constraint.*violation'
+        ],
+        'root_causes': [
+            'Database connection timeout',
+            'Database server unavailable',
+            'SQL query error',
+            'Database deadlock',
+            'Connection pool exhausted',
+            'Database schema issue',
+            'Data integrity violation'
+        ],
+        'recommendations': [
+            'Check database connectivity and network',
+            'Increase connection timeout settings',
+            'Review and optimize SQL queries',
+            'Monitor database performance metrics',
+            'Scale database connection pool',
+            'Verify database schema and migrations',
+            'Review data validation logic'
+        ]
+    },
+    'network': {
+        'patterns': [
+            r'network.*\w+',
+            r'connection.*reset',
+            r'host.*unreachable',
+            r'timeout.*exceeded',
+            r'dns.*resolution.*failed',
+            r'socket.*timeout',
+            r'connection.*aborted',
+            r'network.*unreachable',
+            r'port.*unreachable',
+            r'ssl.*handshake.*failed',
+            r'certificate.*error',
+            r'tls.*error'
+        ],
+        'root_causes': [
+            'Network connectivity issue',
+            'Connection reset by peer',
+            'Host unreachable',
+            'Network timeout',
+            'DNS resolution failure',
+            'SSL/TLS certificate issue',
+            'Firewall blocking connection'
+        ],
+        'recommendations': [
+            'Check network connectivity',
+            'Verify firewall and security group settings',
+            'Test DNS resolution',
+            'Monitor network latency',
+            'Implement retry mechanisms with backoff',
+            'Verify SSL/TLS certificates',
+            'Check proxy and load balancer configuration'
+        ]
+    },
+    'memory': {
+        'patterns': [
+            r'out.*of.*memory',
+            r'memory.*leak',
+            r'heap.*space',
+            r'stack.*overflow',
+            r'gc.*overhead'
+        ],
+        'root_causes': [
+            'Memory exhaustion',
+            'Memory leak detected',
+            'Heap space insufficient',
+            'Stack overflow',
+            'Garbage collection overhead'
+        ],
+        'recommendations': [
+            'Increase memory allocation',
+            'Profile application for memory leaks',
+            'Optimize data structures and algorithms',
+            'Review recursive function calls',
+            'Tune garbage collection parameters'
+        ]
+    },
+    'authentication': {
+        'patterns': [
+            r'authentication.*failed',
+            r'unauthorized',
+            r'access.*denied',
+            r'invalid.*credentials',
+            r'token.*expired'
+        ],
+        'root_causes': [
+            'Authentication failure',
+            'Unauthorized access attempt',
+            'Invalid credentials provided',
+            'Expired authentication token',
+            'Insufficient permissions'
+        ],
+        'recommendations': [
+            'Verify user credentials',
+            'Check authentication service status',
+            'Review access control policies',
+            'Implement token refresh mechanism',
+            'Monitor for suspicious access patterns'
+        ]
+    },
+    'performance': {
+        'patterns': [
+            r'slow.*query',
+            r'response.*time.*exceeded',
+            r'performance.*degraded',
+            r'high.*cpu',
+            r'thread.*pool.*exhausted',
+            r'request.*timeout',
+            r'processing.*slow',
+            r'latency.*high',
+            r'throughput.*low',
+            r'queue.*full',
+            r'backlog.*growing'
+        ],
+        'root_causes': [
+            'Slow database query',
+            'Response time exceeded threshold',
+            'Performance degradation',
+            'High CPU utilization',
+            'Thread pool exhaustion',
+            'Resource contention',
+            'System overload'
+        ],
+        'recommendations': [
+            'Optimize database queries and indexes',
+            'Scale application resources',
+            'Implement caching strategies',
+            'Monitor system resource usage',
+            'Tune thread pool configuration',
+            'Review algorithm efficiency',
+            'Implement load balancing'
+        ]
+    },
+    'application': {
+        'patterns': [
+            r'null.*pointer.*exception',
+            r'array.*index.*out.*of.*bounds',
+            r'class.*not.*found',
+            r'method.*not.*found',
+            r'illegal.*argument',
+            r'runtime.*exception',
+            r'assertion.*failed',
+            r'validation.*failed'
+        ],
+        'root_causes': [
+            'Null pointer dereference',
+            'Array bounds violation',
+            'Missing class or dependency',
+            'Method signature mismatch',
+            'Invalid input parameters',
+            'Runtime assertion failure',
+            'Data validation error'
+        ],
+        'recommendations': [
+            'Add null checks and defensive programming',
+            'Validate array bounds before access',
+            'Verify classpath and dependencies',
+            'Check method signatures and versions',
+            'Implement input validation',
+            'Review business logic assertions',
+            'Strengthen data validation rules'
+        ]
+    }
+}
+
+
+def _intern_strings(strings) -> tuple:
+    """驻留表中的字符串，去重集合比较时可走指针相等的快速路径"""
+    return tuple(sys.intern(string) for string in strings)
+
+
+# 按类别编号展开为并行元组（SoA），在导入时只编译一次，热点路径只做整数下标访问
+_CATEGORY_NAMES = _intern_strings(_ERROR_PATTERNS)
+# 预编译所有模式，并预先计算只与模式本身相关的特异度分数；
+# 热点循环直接调用绑定好的 search 方法，省去每次的属性查找；
+# 模式按特异度降序排列，使评分尽早达到上限 1.0 后退出
+_CATEGORY_SEARCHERS = tuple(
+    tuple(sorted(
+        ((re.compile(p, re.IGNORECASE).search, min(1.0, len(p) / 20.0))  # Normalize pattern complexity
+         for p in data['patterns']),
+        key=lambda searcher: searcher[1],
+        reverse=True
+    ))
+    for data in _ERROR_PATTERNS.values()
+)
+# 每个类别的模式合并为一个分支正则，未命中时跳过逐个模式评分
+_CATEGORY_GATES = tuple(
+    re.compile('|'.join(f'(?:{p})' for p in data['patterns']), re.IGNORECASE).search
+    for data in _ERROR_PATTERNS.values()
+)
+_CATEGORY_CAUSES = tuple(_intern_strings(data['root_causes']) for data in _ERROR_PATTERNS.values())
+_CATEGORY_RECOMMENDATIONS = tuple(_intern_strings(data['recommendations']) for data in _ERROR_PATTERNS.values())
+
+# 所有类别模式融合为一个分支正则，单次扫描即可判断是否有任何模式命中
+_MEGA_RE = _fast_re.compile(
+    '|'.join(f'(?:{p})'
+             for data in _ERROR_PATTERNS.values()
+             for p in data['patterns']),
+    _fast_re.IGNORECASE
+)
+
+# 关键词到根因的映射
+_ERROR_KEYWORD_MAP = {
+    'timeout': 'Request timeout occurred',
+    'refused': 'Connection refused by target',
+    'denied': 'Access or permission denied',
+    'crash': 'Application crash detected',
+    'panic': 'System panic condition',
+    'abort': 'Operation aborted unexpectedly'
+}
+_GENERIC_ERROR_MAP = {
+    'failed': 'Operation failed to complete',
+    'exception': 'Unhandled exception occurred',
+    'error': 'System error detected'
+}
+
+# 服务来源关键词
+_SOURCE_PATTERNS = {
+    'auth': {
+        'keywords': ('auth', 'login', 'user', 'session'),
+        'causes': ['Authentication service issue', 'User session problem'],
+        'recommendations': ['Check authentication service health', 'Verify user session management']
+    },
+    'database': {
+        'keywords': ('db', 'sql', 'postgres', 'mysql', 'mongo'),
+        'causes': ['Database service issue', 'Data access problem'],
+        'recommendations': ['Monitor database performance', 'Check database connections']
+    },
+    'payment': {
+        'keywords': ('payment', 'billing', 'transaction', 'stripe'),
+        'causes': ['Payment processing issue', 'Transaction failure'],
+        'recommendations': ['Check payment gateway status', 'Verify transaction logs']
+    },
+    'api': {
+        'keywords': ('api', 'gateway', 'proxy', 'endpoint'),
+        'causes': ['API service issue', 'Gateway problem'],
+        'recommendations': ['Check API gateway health', 'Verify endpoint availability']
+    }
+}
+
+# 驻留关键词、根因与建议字符串
+_ERROR_KEYWORD_MAP = dict(zip(_intern_strings(_ERROR_KEYWORD_MAP), _intern_strings(_ERROR_KEYWORD_MAP.values())))
+_GENERIC_ERROR_MAP = dict(zip(_intern_strings(_GENERIC_ERROR_MAP), _intern_strings(_GENERIC_ERROR_MAP.values())))
+for _config in _SOURCE_PATTERNS.values():
+    for _field in ('keywords', 'causes', 'recommendations'):
+        _config[_field] = _intern_strings(_config[_field])
+del _config, _field
+
+# 构建 Aho-Corasick 自动机，一次线性扫描找出所有关键词
+_KEYWORDS = _intern_strings(dict.fromkeys([
+    *_ERROR_KEYWORD_MAP,
+    *_GENERIC_ERROR_MAP,
+    *(keyword for config in _SOURCE_PATTERNS.values() for keyword in config['keywords'])
+]))
+_KEYWORD_AUTOMATON = None
+if ahocorasick is not None:
+    _KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for _keyword in _KEYWORDS:
+        _KEYWORD_AUTOMATON.add_word(_keyword, _keyword)
+    _KEYWORD_AUTOMATON.make_automaton()
+    del _keyword
+
+# 未安装 pyahocorasick 时的后备：单个正则一次扫描找出所有关键词。
+# 使用零宽断言使相互重叠的关键词（如 postgresql 中的 postgres 与 sql）都能命中；
+# 同一位置只报告一个分支，因此关键词之间不能互为前缀
+_KEYWORD_RE = re.compile(
+    '(?=(' + '|'.join(re.escape(keyword) for keyword in _KEYWORDS) + '))',
+    re.IGNORECASE
+)
+
+# 上下文分析使用的预编译正则
+_HTTP_RE = re.compile(r'\b(404|500|503|502|401|403)\b')
+# HTTP 状态码与 IPv4 融合为一次扫描；IPv4 使用零宽断言，不会吞掉地址中的状态码
+_NUMERIC_CONTEXT_RE = re.compile(
+    r'(?P<http_status>\b(?:404|500|503|502|401|403)\b)'
+    r'|(?P<ipv4>(?=\b\d{1,3}(?:\.\d{1,3}){3}\b))'
+)
+
+_ANALYZE_CACHE_SIZE = 4096
+
+# 需要进行根因分析的日志级别
+_ERROR_LEVELS = frozenset(['ERROR', 'FATAL', 'CRITICAL'])
+
+# 根因与建议各自最多返回的条数
+_MAX_RESULTS = 4
+
+
+def _append_unique(items, out: list, seen: set, cap: int = _MAX_RESULTS) -> None:
+    """按顺序追加未出现过的条目，达到上限后停止"""
+    for item in items:
+        if len(out) >= cap:
+            return
+        if item not in seen:
+            seen.add(item)
+            out.append(item)
+
+
+def _best_pattern_score(searchers: tuple, message: str, message_length: int) -> float:
+    """计算一个类别内所有模式的最高匹配分数，0 表示没有模式命中"""
+    max_score = 0
+    for search, specificity in searchers:
+        match = search(message)
+        if match:
+            # Calculate score based on match quality
+            score = min(1.0, (match.end() - match.start()) / message_length + specificity)
+            if score > max_score:
+                max_score = score
+                if max_score >= 1.0:
+                    break
+    return max_score
+
+
+class AnalysisContext(NamedTuple):
+    """单次分析的上下文，同时作为结果缓存的键"""
+    message: str
+    level: str
+    source: str
+    has_error_keywords: Any
+    has_special_chars: Any
+    has_numbers: Any
+    message_length: Any
+
+
 class RootCauseAnalyzer:
     """根因分析器 - 基于模式匹配和规则推荐"""
     
+    __slots__ = (
+        '_category_names',
+        '_category_searchers',
+        '_category_gates',
+        '_category_causes',
+        '_category_recommendations',
+        '_mega_re',
+        'error_keyword_map',
+        'generic_error_map',
+        'source_patterns',
+        '_kw_ac',
+        '_analyze_cached',
+    )
+    
     def __init__(self):
-        self.error_patterns = {
-            'database': {
-                'patterns': [
-                    r'database.*\w+',
-                    r'connection.*timeout',
-                    r'database.*not.*available',
-                    r'sql.*error',
-                    r'deadlock',
-                    r'connection.*refused',
-                    r'too many connections',
-                    r'db.*connection.*failed',
-                    r'mysql.*error',
-                    r'postgresql.*error',
-                    r'oracle.*error',
-                    r'sqlite.*error',
-                    r'table.*not.*found',
-                    r'duplicate.*key',
-                    r'constraint.*violation'
-                ],
-                'root_causes': [
-                    'Database connection timeout',
-                    'Database server unavailable',
-                    'SQL query error',
-                    'Database deadlock',
-                    'Connection pool exhausted',
-                    'Database schema issue',
-                    'Data integrity violation'
-                ],
-                'recommendations': [
-                    'Check database connectivity and network',
-                    'Increase connection timeout settings',
-                    'Review and optimize SQL queries',
-                    'Monitor database performance metrics',
-                    'Scale database connection pool',
-                    'Verify database schema and migrations',
-                    'Review data validation logic'
-                ]
-            },
-            'network': {
-                'patterns': [
-                    r'network.*\w+',
-                    r'connection.*reset',
-                    r'host.*unreachable',
-                    r'timeout.*exceeded',
-                    r'dns.*resolution.*failed',
-                    r'socket.*timeout',
-                    r'connection.*aborted',
-                    r'network.*unreachable',
-                    r'port.*unreachable',
-                    r'ssl.*handshake.*failed',
-                    r'certificate.*error',
-                    r'tls.*error'
-                ],
-                'root_causes': [
-                    'Network connectivity issue',
-                    'Connection reset by peer',
-                    'Host unreachable',
-                    'Network timeout',
-                    'DNS resolution failure',
-                    'SSL/TLS certificate issue',
-                    'Firewall blocking connection'
-                ],
-                'recommendations': [
-                    'Check network connectivity',
-                    'Verify firewall and security group settings',
-                    'Test DNS resolution',
-                    'Monitor network latency',
-                    'Implement retry mechanisms with backoff',
-                    'Verify SSL/TLS certificates',
-                    'Check proxy and load balancer configuration'
-                ]
-            },
-            'memory': {
-                'patterns': [
-                    r'out.*of.*memory',
-                    r'memory.*leak',
-                    r'heap.*space',
-                    r'stack.*overflow',
-                    r'gc.*overhead'
-                ],
-                'root_causes': [
-                    'Memory exhaustion',
-                    'Memory leak detected',
-                    'Heap space insufficient',
-                    'Stack overflow',
-                    'Garbage collection overhead'
-                ],
-                'recommendations': [
-                    'Increase memory allocation',
-                    'Profile application for memory leaks',
-                    'Optimize data structures and algorithms',
-                    'Review recursive function calls',
-                    'Tune garbage collection parameters'
-                ]
-            },
-            'authentication': {
-                'patterns': [
-                    r'authentication.*failed',
-                    r'unauthorized',
-                    r'access.*denied',
-                    r'invalid.*credentials',
-                    r'token.*expired'
-                ],
-                'root_causes': [
-                    'Authentication failure',
-                    'Unauthorized access attempt',
-                    'Invalid credentials provided',
-                    'Expired authentication token',
-                    'Insufficient permissions'
-                ],
-                'recommendations': [
-                    'Verify user credentials',
-                    'Check authentication service status',
-                    'Review access control policies',
-                    'Implement token refresh mechanism',
-                    'Monitor for suspicious access patterns'
-                ]
-            },
-            'performance': {
-                'patterns': [
-                    r'slow.*query',
-                    r'response.*time.*exceeded',
-                    r'performance.*degraded',
-                    r'high.*cpu',
-                    r'thread.*pool.*exhausted',
-                    r'request.*timeout',
-                    r'processing.*slow',
-                    r'latency.*high',
-                    r'throughput.*low',
-                    r'queue.*full',
-                    r'backlog.*growing'
-                ],
-                'root_causes': [
-                    'Slow database query',
-                    'Response time exceeded threshold',
-                    'Performance degradation',
-                    'High CPU utilization',
-                    'Thread pool exhaustion',
-                    'Resource contention',
-                    'System overload'
-                ],
-                'recommendations': [
-                    'Optimize database queries and indexes',
-                    'Scale application resources',
-                    'Implement caching strategies',
-                    'Monitor system resource usage',
-                    'Tune thread pool configuration',
-                    'Review algorithm efficiency',
-                    'Implement load balancing'
-                ]
-            },
-            'application': {
-                'patterns': [
-                    r'null.*pointer.*exception',
-                    r'array.*index.*out.*of.*bounds',
-                    r'class.*not.*found',
-                    r'method.*not.*found',
-                    r'illegal.*argument',
-                    r'runtime.*exception',
-                    r'assertion.*failed',
-                    r'validation.*failed'
-                ],
-                'root_causes': [
-                    'Null pointer dereference',
-                    'Array bounds violation',
-                    'Missing class or dependency',
-                    'Method signature mismatch',
-                    'Invalid input parameters',
-                    'Runtime assertion failure',
-                    'Data validation error'
-                ],
-                'recommendations': [
-                    'Add null checks and defensive programming',
-                    'Validate array bounds before access',
-                    'Verify classpath and dependencies',
-                    'Check method signatures and versions',
-                    'Implement input validation',
-                    'Review business logic assertions',
-                    'Strengthen data validation rules'
-                ]
-            }
-        }
+        self._category_names = _CATEGORY_NAMES
+        self._category_searchers = _CATEGORY_SEARCHERS
+        self._category_gates = _CATEGORY_GATES
+        self._category_causes = _CATEGORY_CAUSES
+        self._category_recommendations = _CATEGORY_RECOMMENDATIONS
+        self._mega_re = _MEGA_RE
+        
+        self.error_keyword_map = _ERROR_KEYWORD_MAP
+        self.generic_error_map = _GENERIC_ERROR_MAP
+        self.source_patterns = _SOURCE_PATTERNS
+        self._kw_ac = _KEYWORD_AUTOMATON
+        
+        # 日志流高度重复，按实例缓存分析结果
+        self._analyze_cached = functools.lru_cache(maxsize=_ANALYZE_CACHE_SIZE)(self._analyze_uncached)
     
     def analyze(self, log: Dict[str, Any], processed_log: Dict[str, Any]) -> Dict[str, List[str]]:
         """分析异常日志并生成根因和建议"""
         try:
-            message = log.get('message', '') or ''  # Handle None messages
-            message = message.lower()
-            level = log.get('level', '').upper()
-            source = log.get('source', '')
-            
-            root_causes = []
-            recommendations = []
-            
-            # Only analyze ERROR, FATAL, CRITICAL level logs or logs with error keywords
-            features = processed_log.get('features', {})
-            should_analyze = (
-                level in ['ERROR', 'FATAL', 'CRITICAL'] or 
-                features.get('has_error_keywords', False)
-            )
-            
-            if not should_analyze:
+            ctx = self._build_context(log, processed_log)
+            if ctx is None:
                 return {
                     'root_causes': [],
                     'recommendations': []
                 }
             
-            # Pattern-based analysis with scoring
-            matched_categories = self._match_error_patterns_with_score(message)
-            
-            # Process matched categories by priority (highest score first)
-            for category, score in matched_categories:
-                category_data = self.error_patterns[category]
-                # Add more causes/recommendations for higher scoring matches
-                num_items = 3 if score > 0.7 else 2 if score > 0.5 else 1
-                root_causes.extend(category_data['root_causes'][:num_items])
-                recommendations.extend(category_data['recommendations'][:num_items])
-            
-            # Level-based analysis
-            if level in ['ERROR', 'FATAL', 'CRITICAL']:
-                if not root_causes:  # If no patterns matched
-                    root_causes.extend(self._get_generic_error_causes(message))
-                    recommendations.extend(self._get_generic_error_recommendations())
-            
-            # Feature-based analysis
-            if features.get('has_error_keywords'):
-                additional_causes = self._analyze_error_keywords(message)
-                root_causes.extend(additional_causes)
-            
-            # Source-based analysis
-            source_analysis = self._analyze_by_source(source, message)
-            if source_analysis:
-                root_causes.extend(source_analysis.get('causes', []))
-                recommendations.extend(source_analysis.get('recommendations', []))
-            
-            # Context-aware analysis
-            context_analysis = self._analyze_context(log, processed_log)
-            if context_analysis:
-                root_causes.extend(context_analysis.get('causes', []))
-                recommendations.extend(context_analysis.get('recommendations', []))
-            
-            # Remove duplicates while preserving order
-            root_causes = list(dict.fromkeys(root_causes))
-            recommendations = list(dict.fromkeys(recommendations))
-            
-            # Limit results to most relevant
-            root_causes = root_causes[:4]  # Increased from 3
-            recommendations = recommendations[:4]  # Increased from 3
+            root_causes, recommendations = self._analyze_cached(ctx)
             
             return {
-                'root_causes': root_causes,
-                'recommendations': recommendations
+                'root_causes': list(root_causes),
+                'recommendations': list(recommendations)
             }
             
         except Exception as e:
-            logging.error(f"Error in root cause analysis: {str(e)}")
+            logging.error("Error in root cause analysis: %s", e)
             return {
                 'root_causes': ['Unknown error occurred'],
                 'recommendations': ['Review log details and system status']
             }
     
+    def analyze_batch(self, logs: List[Dict[str, Any]], processed_logs: List[Dict[str, Any]]) -> List[Dict[str, List[str]]]:
+        """批量分析日志，批内相同的日志只分析一次"""
+        batch_results = {}
+        results = []
+        
+        for log, processed_log in zip(logs, processed_logs):
+            try:
+                ctx = self._build_context(log, processed_log)
+                if ctx is None:
+                    root_causes, recommendations = (), ()
+                else:
+                    analysis = batch_results.get(ctx)
+                    if analysis is None:
+                        analysis = batch_results[ctx] = self._analyze_cached(ctx)
+                    root_causes, recommendations = analysis
+                
+                results.append({
+                    'root_causes': list(root_causes),
+                    'recommendations': list(recommendations)
+                })
+                
+            except Exception as e:
+                logging.error("Error in root cause analysis: %s", e)
+                results.append({
+                    'root_causes': ['Unknown error occurred'],
+                    'recommendations': ['Review log details and system status']
+                })
+        
+        return results
+    
+    def _build_context(self, log: Dict[str, Any], processed_log: Dict[str, Any]) -> Optional[AnalysisContext]:
+        """构建单次分析的上下文，无需分析的日志返回 None"""
+        features = processed_log.get('features', {})
+        level = log.get('level', '').upper()
+        has_error_keywords = features.get('has_error_keywords', False)
+        
+        # Only analyze ERROR, FATAL, CRITICAL level logs or logs with error keywords
+        # 先检查这些廉价条件，大部分 INFO/DEBUG 日志无需接触消息本身
+        if level not in _ERROR_LEVELS and not has_error_keywords:
+            return None
+        
+        return AnalysisContext(
+            message=log.get('message', '') or '',  # Handle None messages
+            level=level,
+            source=log.get('source', ''),
+            has_error_keywords=has_error_keywords,
+            has_special_chars=features.get('has_special_chars', False),
+            has_numbers=features.get('has_numbers', False),
+            message_length=features.get('message_length', 0)
+        )
+    
+    def _analyze_uncached(self, ctx: AnalysisContext) -> Tuple[tuple, tuple]:
+        """执行实际分析，结果以元组形式返回以便缓存"""
+        root_causes, seen_causes = [], set()
+        recommendations, seen_recommendations = [], set()
+        
+        # Pattern-based analysis with scoring
+        matched_categories = self._match_error_patterns_with_score(ctx)
+        
+        # Process matched categories by priority (highest score first)
+        for category_id, score in matched_categories:
+            # Add more causes/recommendations for higher scoring matches
+            num_items = 3 if score > 0.7 else 2 if score > 0.5 else 1
+            _append_unique(self._category_causes[category_id][:num_items], root_causes, seen_causes)
+            _append_unique(self._category_recommendations[category_id][:num_items], recommendations, seen_recommendations)
+        
+        # 两类结果都已达到上限时，后续分析不会再产生输出
+        if len(root_causes) >= _MAX_RESULTS and len(recommendations) >= _MAX_RESULTS:
+            return tuple(root_causes), tuple(recommendations)
+        
+        # 一次扫描得到消息中出现的所有关键词
+        keyword_hits = self._find_keywords(ctx.message)
+        
+        # Level-based analysis
+        if ctx.level in _ERROR_LEVELS:
+            if not root_causes:  # If no patterns matched
+                _append_unique(self._get_generic_error_causes(keyword_hits), root_causes, seen_causes)
+                _append_unique(self._get_generic_error_recommendations(), recommendations, seen_recommendations)
+        
+        # Feature-based analysis
+        if ctx.has_error_keywords and len(root_causes) < _MAX_RESULTS:
+            additional_causes = self._analyze_error_keywords(keyword_hits)
+            _append_unique(additional_causes, root_causes, seen_causes)
+        
+        # Source-based analysis
+        source_analysis = self._analyze_by_source(ctx, keyword_hits)
+        if source_analysis:
+            _append_unique(source_analysis.get('causes', []), root_causes, seen_causes)
+            _append_unique(source_analysis.get('recommendations', []), recommendations, seen_recommendations)
+        
+        if len(root_causes) >= _MAX_RESULTS and len(recommendations) >= _MAX_RESULTS:
+            return tuple(root_causes), tuple(recommendations)
+        
+        # Context-aware analysis
+        context_analysis = self._analyze_context(ctx)
+        if context_analysis:
+            _append_unique(context_analysis.get('causes', []), root_causes, seen_causes)
+            _append_unique(context_analysis.get('recommendations', []), recommendations, seen_recommendations)
+        
+        return tuple(root_causes), tuple(recommendations)
+    
     def _match_error_patterns(self, message: str) -> List[str]:
         """匹配错误模式"""
         matched_categories = []
         
-        for category, data in self.error_patterns.items():
-            for pattern in data['patterns']:
-                if re.search(pattern, message, re.IGNORECASE):
-                    matched_categories.append(category)
-                    break  # Only match once per category
+        for category, gate in zip(self._category_names, self._category_gates):
+            if gate(message):
+                matched_categories.append(category)
         
         return matched_categories
     
-    def _match_error_patterns_with_score(self, message: str) -> List[tuple]:
-        """匹配错误模式并返回评分"""
+    def _match_error_patterns_with_score(self, ctx: AnalysisContext) -> List[tuple]:
+        """匹配错误模式，返回按评分降序排列的 (类别编号, 评分)"""
+        message = ctx.message
         matched_categories = []
         
-        for category, data in self.error_patterns.items():
-            max_score = 0
-            for pattern in data['patterns']:
-                match = re.search(pattern, message, re.IGNORECASE)
-                if match:
-                    # Calculate score based on match quality
-                    match_length = len(match.group())
-                    pattern_specificity = len(pattern) / 20.0  # Normalize pattern complexity
-                    score = min(1.0, (match_length / len(message)) + pattern_specificity)
-                    max_score = max(max_score, score)
+        # 融合正则未命中时，任何类别都不可能命中
+        if not self._mega_re.search(message):
+            return matched_categories
+        
+        message_length = len(message)
+        for category_id, gate in enumerate(self._category_gates):
+            if not gate(message):
+                continue
+            
+            max_score = _best_pattern_score(self._category_searchers[category_id], message, message_length)
             
             if max_score > 0:
-                matched_categories.append((category, max_score))
+                matched_categories.append((category_id, max_score))
         
         # Sort by score descending
         return sorted(matched_categories, key=lambda x: x[1], reverse=True)
     
-    def _get_generic_error_causes(self, message: str) -> List[str]:
+    def _find_keywords(self, message: str) -> set:
+        """找出消息中出现的关键词"""
+        if self._kw_ac is not None:
+            # 自动机中的关键词为小写，只有这里需要消息的小写副本
+            return {keyword for _, keyword in self._kw_ac.iter(message.lower())}
+        return {keyword.lower() for keyword in _KEYWORD_RE.findall(message)}
+    
+    def _get_generic_error_causes(self, keyword_hits: set) -> List[str]:
         """获取通用错误原因"""
-        generic_causes = []
-        
-        if 'failed' in message:
-            generic_causes.append('Operation failed to complete')
-        if 'exception' in message:
-            generic_causes.append('Unhandled exception occurred')
-        if 'error' in message:
-            generic_causes.append('System error detected')
+        generic_causes = [cause for keyword, cause in self.generic_error_map.items()
+                          if keyword in keyword_hits]
         
         if not generic_causes:
             generic_causes.append('Unexpected system behavior')
@@ -324,56 +572,19 @@ class RootCauseAnalyzer:
             'Review recent changes and deployments'
         ]
     
-    def _analyze_error_keywords(self, message: str) -> List[str]:
+    def _analyze_error_keywords(self, keyword_hits: set) -> List[str]:
         """基于错误关键词分析"""
-        additional_causes = []
-        
-        error_keyword_map = {
-            'timeout': 'Request timeout occurred',
-            'refused': 'Connection refused by target',
-            'denied': 'Access or permission denied',
-            'crash': 'Application crash detected',
-            'panic': 'System panic condition',
-            'abort': 'Operation aborted unexpectedly'
-        }
-        
-        for keyword, cause in error_keyword_map.items():
-            if keyword in message:
-                additional_causes.append(cause)
-        
-        return additional_causes
+        return [cause for keyword, cause in self.error_keyword_map.items()
+                if keyword in keyword_hits]
     
-    def _analyze_by_source(self, source: str, message: str) -> Dict[str, List[str]]:
+    def _analyze_by_source(self, ctx: AnalysisContext, keyword_hits: set) -> Dict[str, List[str]]:
         """基于服务来源分析"""
-        source_patterns = {
-            'auth': {
-                'keywords': ['auth', 'login', 'user', 'session'],
-                'causes': ['Authentication service issue', 'User session problem'],
-                'recommendations': ['Check authentication service health', 'Verify user session management']
-            },
-            'database': {
-                'keywords': ['db', 'sql', 'postgres', 'mysql', 'mongo'],
-                'causes': ['Database service issue', 'Data access problem'],
-                'recommendations': ['Monitor database performance', 'Check database connections']
-            },
-            'payment': {
-                'keywords': ['payment', 'billing', 'transaction', 'stripe'],
-                'causes': ['Payment processing issue', 'Transaction failure'],
-                'recommendations': ['Check payment gateway status', 'Verify transaction logs']
-            },
-            'api': {
-                'keywords': ['api', 'gateway', 'proxy', 'endpoint'],
-                'causes': ['API service issue', 'Gateway problem'],
-                'recommendations': ['Check API gateway health', 'Verify endpoint availability']
-            }
-        }
-        
-        source_lower = source.lower()
-        message_lower = message.lower()
+        source_lower = ctx.source.lower()
         
-        for service_type, config in source_patterns.items():
+        # 先检查较短的 source，消息中的关键词已由自动机预先扫描
+        for config in self.source_patterns.values():
             if any(keyword in source_lower for keyword in config['keywords']) or \
-               any(keyword in message_lower for keyword in config['keywords']):
+               not keyword_hits.isdisjoint(config['keywords']):
                 return {
                     'causes': config['causes'],
                     'recommendations': config['recommendations']
@@ -381,18 +592,16 @@ class RootCauseAnalyzer:
         
         return {}
     
-    def _analyze_context(self, log: Dict[str, Any], processed_log: Dict[str, Any]) -> Dict[str, List[str]]:
+    def _analyze_context(self, ctx: AnalysisContext) -> Dict[str, List[str]]:
         """基于上下文分析"""
-        features = processed_log.get('features', {})
-        message = log.get('message', '').lower()
-        
+        message = ctx.message
         context_analysis = {
             'causes': [],
             'recommendations': []
         }
         
         # Message length analysis
-        message_length = features.get('message_length', 0)
+        message_length = ctx.message_length
         if message_length > 1000:
             context_analysis['causes'].append('Verbose error message indicates complex issue')
             context_analysis['recommendations'].append('Review detailed error context')
@@ -401,18 +610,21 @@ class RootCauseAnalyzer:
             context_analysis['recommendations'].append('Enable more detailed logging')
         
         # Special character analysis
-        if features.get('has_special_chars'):
+        if ctx.has_special_chars:
             if any(char in message for char in ['[', ']', '{', '}']):
                 context_analysis['causes'].append('Structured data parsing issue')
                 context_analysis['recommendations'].append('Verify data format and parsing logic')
         
         # Numeric pattern analysis
-        if features.get('has_numbers'):
-            if re.search(r'\b(404|500|503|502|401|403)\b', message):
-                context_analysis['causes'].append('HTTP status code error')
-                context_analysis['recommendations'].append('Check HTTP service and routing')
-            elif re.search(r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b', message):
-                context_analysis['causes'].append('Network address related issue')
-                context_analysis['recommendations'].append('Verify network configuration')
+        if ctx.has_numbers:
+            match = _NUMERIC_CONTEXT_RE.search(message)
+            if match:
+                # 先遇到 IPv4 时，只需从该位置继续查找状态码，整体仍是一次遍历
+                if match.lastgroup == 'http_status' or _HTTP_RE.search(message, match.start()):
+                    context_analysis['causes'].append('HTTP status code error')
+                    context_analysis['recommendations'].append('Check HTTP service and routing')
+                else:
+                    context_analysis['causes'].append('Network address related issue')
+                    context_analysis['recommendations'].append('Verify network configuration')
         
         return context_analysis if context_analysis['causes'] else {}
\ No newline at end of file
@@ -6,7 +6,8 @@
 import os
 import sys
 import json
-import requests
+import asyncio
+import httpx
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -75,23 +76,20 @@ def test_llm_analyzer_direct():
     print("单个日志分析结果:")
     print(json.dumps(single_result, ensure_ascii=False, indent=2))
 
-def test_llm_api_server():
-    """测试LLM API服务器"""
-    print("=== 测试LLM API服务器 ===")
-    
-    base_url = "http://localhost:5000"
-    
-    # 测试健康检查
+BASE_URL = "http://localhost:5000"
+
+async def _check_health(client):
+    """测试健康检查"""
     try:
-        response = requests.get(f"{base_url}/health")
+        response = await client.get("/health")
         print("健康检查结果:")
         print(json.dumps(response.json(), ensure_ascii=False, indent=2))
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         print("无法连接到LLM API服务器。请先启动服务器:")
         print("cd python-ai && python src/llm_api.py")
-        return
-    
-    # 测试批量分析API
+
+async def _check_batch_api(client):
+    """测试批量分析API"""
     test_data = {
         'logs': [
             {
@@ -109,13 +107,14 @@ def test_llm_api_server():
     }
     
     try:
-        response = requests.post(f"{base_url}/analyze/batch", json=test_data)
+        response = await client.post("/analyze/batch", json=test_data)
         print("\n批量分析API结果:")
         print(json.dumps(response.json(), ensure_ascii=False, indent=2))
     except Exception as e:
         print(f"批量分析API测试失败: {e}")
-    
-    # 测试单个日志分析API
+
+async def _check_single_api(client):
+    """测试单个日志分析API"""
     single_data = {
         'log': {
             'id': '1',
@@ -127,18 +126,14 @@ def test_llm_api_server():
     }
     
     try:
-        response = requests.post(f"{base_url}/analyze/single", json=single_data)
+        response = await client.post("/analyze/single", json=single_data)
         print("\n单个日志分析API结果:")
         print(json.dumps(response.json(), ensure_ascii=False, indent=2))
     except Exception as e:
         print(f"单个日志分析API测试失败: {e}")
 
-def test_custom_prompt():
+async def _check_custom_prompt(client):
     """测试自定义提示词"""
-    print("=== 测试自定义提示词 ===")
-    
-    base_url = "http://localhost:5000"
-    
     custom_data = {
         'prompt': '''请分析以下系统日志并提供建议：
 
@@ -151,14 +146,29 @@ def test_custom_prompt():
     }
     
     try:
-        response = requests.post(f"{base_url}/analyze/custom", json=custom_data)
-        print("自定义分析结果:")
+        response = await client.post("/analyze/custom", json=custom_data)
+        print("\n自定义分析结果:")
         print(json.dumps(response.json(), ensure_ascii=False, indent=2))
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         print("无法连接到LLM API服务器")
     except Exception as e:
         print(f"自定义分析测试失败: {e}")
 
+async def _run_api_checks():
+    # LLM调用耗时较长，与 requests 默认行为一致不设置超时
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=None) as client:
+        await asyncio.gather(
+            _check_health(client),
+            _check_batch_api(client),
+            _check_single_api(client),
+            _check_custom_prompt(client)
+        )
+
+def test_llm_api_server():
+    """并发测试LLM API服务器的各个接口"""
+    print("=== 测试LLM API服务器 ===")
+    asyncio.run(_run_api_checks())
+
 if __name__ == '__main__':
     print("LLM分析功能测试")
     print("="*50)
@@ -172,6 +182,4 @@ if __name__ == '__main__':
     # 运行测试
     test_llm_analyzer_direct()
     print("\n" + "="*50 + "\n")
-    test_llm_api_server()
-    print("\n" + "="*50 + "\n")
-    test_custom_prompt()
\ No newline at end of file
+    test_llm_api_server()
\ No newline at end of file
@@ -1,20 +1,65 @@
 #!/usr/bin/env python3
 """
 增强版API测试脚本 - 专门测试filebeat nginx日志接口
-测试单一的 /api/v1/logs 端点，模拟filebeat发送的nginx日志数据
+模拟filebeat发送的nginx日志数据，每 100 条一组提交到 /api/v1/logs/batch 端点
 包含正常流量和异常流量（8:2比例），用于测试异常检测功能
 """
 
 import requests
+import aiohttp
+import asyncio
 import json
+import orjson
 import time
 import random
+import sys
+import numpy as np
 from datetime import datetime, timezone
+from itertools import islice
 
 API_URL = "http://localhost:8080"
+JSON_HEADERS = {"Content-Type": "application/json"}
 
-def generate_normal_logs():
-    """生成正常的nginx日志数据"""
+# 复用连接的全局会话，避免每个请求重新握手
+SESSION = requests.Session()
+SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=32))
+
+# 固定测试日志在模块加载时序列化一次（时间戳取加载时刻）
+NGINX_ACCESS_LOG_BYTES = orjson.dumps({
+    "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+    "level": "INFO",
+    "message": "192.168.1.100 - - [25/Dec/2025:10:30:45 +0800] \"GET /api/health HTTP/1.1\" 200 15 \"-\" \"curl/7.68.0\"",
+    "source": "nginx-access",
+    "metadata": {
+        "remote_addr": "192.168.1.100",
+        "response_code": "200",
+        "method": "GET",
+        "url": "/api/health",
+        "user_agent": "curl/7.68.0"
+    }
+})
+
+NGINX_ERROR_LOG_BYTES = orjson.dumps({
+    "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+    "level": "ERROR",
+    "message": "2025/12/25 10:30:45 [error] 1234#0: *1 connect() failed (111: Connection refused) while connecting to upstream",
+    "source": "nginx-error",
+    "metadata": {
+        "pid": "1234",
+        "tid": "0",
+        "connection_id": "1"
+    }
+})
+
+INVALID_LOG_BYTES = orjson.dumps({
+    "timestamp": "invalid-timestamp",
+    "level": "",  # 空级别
+    "message": "",  # 空消息
+    "source": ""  # 空来源
+})
+
+def generate_normal_logs(n=40):
+    """逐条生成正常的nginx日志数据"""
     normal_ips = ["192.168.1.100", "10.0.0.1", "172.16.0.10", "203.0.113.45", "198.51.100.23"]
     normal_urls = [
         "/", "/api/health", "/api/v1/dashboard/stats", "/api/v1/analysis/results",
@@ -27,18 +72,29 @@ def generate_normal_logs():
         "curl/7.68.0", "filebeat/8.11.0", "Go-http-client/1.1"
     ]
     
-    logs = []
-    for _ in range(40):  # 生成40个正常日志
-        ip = random.choice(normal_ips)
-        url = random.choice(normal_urls)
-        user_agent = random.choice(normal_user_agents)
-        method = random.choice(["GET", "POST", "PUT", "DELETE"])
-        status_code = random.choice([200, 201, 204, 301, 302, 304])
+    # 时间戳在循环外只取一次，测试数据不需要逐条唯一
+    now_iso = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+    now_str = datetime.now().strftime("%d/%b/%Y:%H:%M:%S %z")
+    methods = ("GET", "POST", "PUT", "DELETE")
+    status_codes = (200, 201, 204, 301, 302, 304)
+    
+    # 一次性生成全部随机下标，避免逐条调用 random.choice
+    rng = np.random.default_rng()
+    idx = rng.integers(0, [len(normal_ips), len(normal_urls), len(normal_user_agents),
+                           len(methods), len(status_codes)], size=(n, 5)).tolist()
+    sizes = rng.integers(100, 5001, size=(n, 2)).tolist()
+    
+    for (i0, i1, i2, i3, i4), (size_msg, size_meta) in zip(idx, sizes):
+        ip = normal_ips[i0]
+        url = normal_urls[i1]
+        user_agent = normal_user_agents[i2]
+        method = methods[i3]
+        status_code = status_codes[i4]
         
         log = {
-            "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+            "timestamp": now_iso,
             "level": "INFO",
-            "message": f'{ip} - - [{datetime.now().strftime("%d/%b/%Y:%H:%M:%S %z")}] "{method} {url} HTTP/1.1" {status_code} {random.randint(100, 5000)} "-" "{user_agent}"',
+            "message": f'{ip} - - [{now_str}] "{method} {url} HTTP/1.1" {status_code} {size_msg} "-" "{user_agent}"',
             "source": "nginx-access",
             "metadata": {
                 "remote_addr": ip,
@@ -46,93 +102,59 @@ def generate_normal_logs():
                 "method": method,
                 "url": url,
                 "user_agent": user_agent,
-                "response_size": str(random.randint(100, 5000))
+                "response_size": str(size_meta)
             }
         }
-        logs.append(log)
-    
-    return logs
+        yield log
 
-def generate_anomalous_logs():
-    """生成异常的nginx日志数据"""
-    malicious_ips = ["1.2.3.4", "5.6.7.8", "9.10.11.12", "13.14.15.16", "17.18.19.20"]
-    
-    logs = []
-    
+# 攻击类型表: (payloads, 响应码, User-Agent, attack_type)
+ATTACKS = (
     # SQL注入攻击 (3个)
-    sql_injection_payloads = [
+    ((
         "/api/users?id=1' OR '1'='1",
         "/login?username=admin'--&password=anything",
         "/search?q='; DROP TABLE users; --"
-    ]
-    
-    for payload in sql_injection_payloads:
-        log = {
-            "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
-            "level": "INFO",
-            "message": f'{random.choice(malicious_ips)} - - [{datetime.now().strftime("%d/%b/%Y:%H:%M:%S %z")}] "GET {payload} HTTP/1.1" 400 0 "-" "sqlmap/1.6.12"',
-            "source": "nginx-access",
-            "metadata": {
-                "remote_addr": random.choice(malicious_ips),
-                "response_code": "400",
-                "method": "GET",
-                "url": payload,
-                "user_agent": "sqlmap/1.6.12",
-                "attack_type": "sql_injection"
-            }
-        }
-        logs.append(log)
-    
+    ), "400", "sqlmap/1.6.12", "sql_injection"),
     # XSS攻击 (2个)
-    xss_payloads = [
+    ((
         "/search?q=<script>alert('XSS')</script>",
         "/comment?text=<img src=x onerror=alert(1)>"
-    ]
-    
-    for payload in xss_payloads:
-        log = {
-            "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
-            "level": "INFO",
-            "message": f'{random.choice(malicious_ips)} - - [{datetime.now().strftime("%d/%b/%Y:%H:%M:%S %z")}] "GET {payload} HTTP/1.1" 403 0 "-" "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"',
-            "source": "nginx-access",
-            "metadata": {
-                "remote_addr": random.choice(malicious_ips),
-                "response_code": "403",
-                "method": "GET",
-                "url": payload,
-                "user_agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
-                "attack_type": "xss"
-            }
-        }
-        logs.append(log)
-    
+    ), "403", "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36", "xss"),
     # 路径遍历攻击 (2个)
-    path_traversal_payloads = [
+    ((
         "/api/files?path=../../../etc/passwd",
         "/download?file=....//....//....//etc/shadow"
-    ]
-    
-    for payload in path_traversal_payloads:
-        log = {
-            "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
-            "level": "INFO",
-            "message": f'{random.choice(malicious_ips)} - - [{datetime.now().strftime("%d/%b/%Y:%H:%M:%S %z")}] "GET {payload} HTTP/1.1" 404 0 "-" "curl/7.68.0"',
-            "source": "nginx-access",
-            "metadata": {
-                "remote_addr": random.choice(malicious_ips),
-                "response_code": "404",
-                "method": "GET",
-                "url": payload,
-                "user_agent": "curl/7.68.0",
-                "attack_type": "path_traversal"
+    ), "404", "curl/7.68.0", "path_traversal"),
+)
+
+def generate_anomalous_logs():
+    """逐条生成异常的nginx日志数据（共10条）"""
+    malicious_ips = ["1.2.3.4", "5.6.7.8", "9.10.11.12", "13.14.15.16", "17.18.19.20"]
+    now_iso = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+    now_str = datetime.now().strftime("%d/%b/%Y:%H:%M:%S %z")
+    rc = random.choice
+    
+    for payloads, status, user_agent, attack_type in ATTACKS:
+        for payload in payloads:
+            yield {
+                "timestamp": now_iso,
+                "level": "INFO",
+                "message": f'{rc(malicious_ips)} - - [{now_str}] "GET {payload} HTTP/1.1" {status} 0 "-" "{user_agent}"',
+                "source": "nginx-access",
+                "metadata": {
+                    "remote_addr": rc(malicious_ips),
+                    "response_code": status,
+                    "method": "GET",
+                    "url": payload,
+                    "user_agent": user_agent,
+                    "attack_type": attack_type
+                }
             }
-        }
-        logs.append(log)
     
     # 系统错误日志 (2个)
     error_logs = [
         {
-            "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+            "timestamp": now_iso,
             "level": "ERROR",
             "message": "2025/12/25 10:30:45 [error] 1234#0: *1 connect() failed (111: Connection refused) while connecting to upstream",
             "source": "nginx-error",
@@ -144,7 +166,7 @@ def generate_anomalous_logs():
             }
         },
         {
-            "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+            "timestamp": now_iso,
             "level": "FATAL",
             "message": "2025/12/25 10:31:00 [crit] 1234#0: *2 SSL_do_handshake() failed (SSL: error:14094416:SSL routines:ssl3_read_bytes:sslv3 alert certificate unknown)",
             "source": "nginx-error",
@@ -157,14 +179,14 @@ def generate_anomalous_logs():
         }
     ]
     
-    logs.extend(error_logs)
+    yield from error_logs
     
     # DDoS模拟 - 同一IP大量请求 (1个)
     ddos_ip = "99.88.77.66"
     log = {
-        "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+        "timestamp": now_iso,
         "level": "WARN",
-        "message": f'{ddos_ip} - - [{datetime.now().strftime("%d/%b/%Y:%H:%M:%S %z")}] "GET / HTTP/1.1" 429 0 "-" "python-requests/2.28.1"',
+        "message": f'{ddos_ip} - - [{now_str}] "GET / HTTP/1.1" 429 0 "-" "python-requests/2.28.1"',
         "source": "nginx-access",
         "metadata": {
             "remote_addr": ddos_ip,
@@ -176,20 +198,21 @@ def generate_anomalous_logs():
             "request_rate": "1000/min"
         }
     }
-    logs.append(log)
-    
-    return logs
+    yield log
 
-def generate_test_dataset():
-    """生成测试数据集，正常:异常 = 8:2"""
-    normal_logs = generate_normal_logs()  # 40个正常日志
-    anomalous_logs = generate_anomalous_logs()  # 10个异常日志
-    
-    # 混合并随机排序
-    all_logs = normal_logs + anomalous_logs
-    random.shuffle(all_logs)
-    
-    return all_logs, len(normal_logs), len(anomalous_logs)
+def iter_test_dataset(n_normal=40, n_anomalous=10):
+    """按 8:2 比例随机交错产出测试日志，不整体物化和打乱"""
+    normal_logs = generate_normal_logs(n_normal)
+    anomalous_logs = generate_anomalous_logs()
+    
+    # 按剩余数量加权抽取，效果等同于整体随机打乱
+    while n_normal or n_anomalous:
+        if random.random() * (n_normal + n_anomalous) < n_anomalous:
+            n_anomalous -= 1
+            yield next(anomalous_logs)
+        else:
+            n_normal -= 1
+            yield next(normal_logs)
 
 def test_endpoint(name, method, url, data=None, headers=None):
     """测试API端点"""
@@ -197,9 +220,10 @@ def test_endpoint(name, method, url, data=None, headers=None):
     
     try:
         if method.upper() == "GET":
-            response = requests.get(url, headers=headers, timeout=10)
+            response = SESSION.get(url, headers=headers, timeout=10)
         elif method.upper() == "POST":
-            response = requests.post(url, json=data, headers=headers, timeout=10)
+            body = data if isinstance(data, bytes) else orjson.dumps(data)
+            response = SESSION.post(url, data=body, headers={**JSON_HEADERS, **(headers or {})}, timeout=10)
         else:
             print(f"❌ 不支持的HTTP方法: {method}")
             return False
@@ -237,6 +261,36 @@ def test_endpoint(name, method, url, data=None, headers=None):
         print()
         return False
 
+BULK_SIZE = 100  # 每次批量提交的日志条数
+
+async def send_chunk(session, sem, start, chunk, results):
+    """批量提交一组日志，整组共享同一个响应状态"""
+    async with sem:
+        try:
+            body = orjson.dumps({"logs": chunk})
+            async with session.post(f"{API_URL}/api/v1/logs/batch", data=body, headers=JSON_HEADERS,
+                                    timeout=aiohttp.ClientTimeout(total=10)) as response:
+                status, text, error = response.status, await response.text(), None
+        except Exception as e:
+            status, text, error = None, None, e
+        results.extend((start + j, log['source'], log['level'], log.get('metadata', {}).get('attack_type'),
+                        status, text, error) for j, log in enumerate(chunk))
+
+async def send_all(test_logs):
+    """边生成边按 BULK_SIZE 分块，用单个会话并发提交"""
+    results = []
+    sem = asyncio.Semaphore(16)
+    connector = aiohttp.TCPConnector(limit=20, limit_per_host=20)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async with asyncio.TaskGroup() as tg:
+            test_logs = iter(test_logs)
+            start = 1
+            while chunk := list(islice(test_logs, BULK_SIZE)):
+                tg.create_task(send_chunk(session, sem, start, chunk, results))
+                start += len(chunk)
+    results.sort(key=lambda r: r[0])
+    return results
+
 def main():
     print("🚀 开始测试增强版日志分析系统API...")
     print("📝 专门测试filebeat nginx日志接口 + 异常检测")
@@ -263,48 +317,23 @@ def main():
     
     # 4. 发送基础测试日志
     total_tests += 1
-    nginx_access_log = {
-        "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
-        "level": "INFO",
-        "message": "192.168.1.100 - - [25/Dec/2025:10:30:45 +0800] \"GET /api/health HTTP/1.1\" 200 15 \"-\" \"curl/7.68.0\"",
-        "source": "nginx-access",
-        "metadata": {
-            "remote_addr": "192.168.1.100",
-            "response_code": "200",
-            "method": "GET",
-            "url": "/api/health",
-            "user_agent": "curl/7.68.0"
-        }
-    }
-    
-    if test_endpoint("发送基础nginx access日志", "POST", f"{API_URL}/api/v1/logs", nginx_access_log):
+    if test_endpoint("发送基础nginx access日志", "POST", f"{API_URL}/api/v1/logs", NGINX_ACCESS_LOG_BYTES):
         success_count += 1
     
     # 5. 发送nginx error日志
     total_tests += 1
-    nginx_error_log = {
-        "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
-        "level": "ERROR",
-        "message": "2025/12/25 10:30:45 [error] 1234#0: *1 connect() failed (111: Connection refused) while connecting to upstream",
-        "source": "nginx-error",
-        "metadata": {
-            "pid": "1234",
-            "tid": "0",
-            "connection_id": "1"
-        }
-    }
-    
-    if test_endpoint("发送nginx error日志", "POST", f"{API_URL}/api/v1/logs", nginx_error_log):
+    if test_endpoint("发送nginx error日志", "POST", f"{API_URL}/api/v1/logs", NGINX_ERROR_LOG_BYTES):
         success_count += 1
     
     # 6. 生成并发送大量测试数据
     total_tests += 1
     print("🔍 生成测试数据集（正常:异常 = 8:2）...")
-    test_logs, normal_count, anomalous_count = generate_test_dataset()
+    normal_count, anomalous_count = 40, 10
+    total_count = normal_count + anomalous_count
     
-    print(f"   📊 生成了 {len(test_logs)} 条日志:")
-    print(f"   ✅ 正常日志: {normal_count} 条 ({normal_count/len(test_logs)*100:.1f}%)")
-    print(f"   ⚠️  异常日志: {anomalous_count} 条 ({anomalous_count/len(test_logs)*100:.1f}%)")
+    print(f"   📊 生成了 {total_count} 条日志:")
+    print(f"   ✅ 正常日志: {normal_count} 条 ({normal_count/total_count*100:.1f}%)")
+    print(f"   ⚠️  异常日志: {anomalous_count} 条 ({anomalous_count/total_count*100:.1f}%)")
     print()
     
     print("🔍 批量发送测试数据...")
@@ -312,41 +341,44 @@ def main():
     sent_count = 0
     failed_count = 0
     
-    for i, log_data in enumerate(test_logs, 1):
-        print(f"   发送日志 {i}/{len(test_logs)}: {log_data['source']} - {log_data['level']}", end="")
-        
+    results = asyncio.run(send_all(iter_test_dataset(normal_count, anomalous_count)))
+    
+    # 每条日志拼成一行写入缓冲，每16条统一写一次 stdout
+    buf = []
+    for i, source, level, attack_type, status, text, error in results:
         # 显示攻击类型（如果有）
-        if 'attack_type' in log_data.get('metadata', {}):
-            print(f" [{log_data['metadata']['attack_type']}]", end="")
+        attack_suffix = f" [{attack_type}]" if attack_type is not None else ""
+        detail = ""
         
-        try:
-            response = requests.post(f"{API_URL}/api/v1/logs", json=log_data, timeout=10)
-            if response.status_code in [200, 201]:
-                print(" ✅")
-                sent_count += 1
-            else:
-                print(f" ❌ ({response.status_code})")
-                # Print error details for debugging
+        if error is not None:
+            status_part = f"❌ (异常: {str(error)[:50]})"
+            failed_count += 1
+            batch_success = False
+        elif status in [200, 201]:
+            status_part = "✅"
+            sent_count += 1
+        else:
+            status_part = f"❌ ({status})"
+            # Print error details for debugging
+            if i <= 3:  # Only show first 3 errors to avoid spam
                 try:
-                    error_data = response.json()
-                    if i <= 3:  # Only show first 3 errors to avoid spam
-                        print(f"      错误详情: {error_data.get('message', 'Unknown error')}")
+                    error_data = json.loads(text)
+                    detail = f"      错误详情: {error_data.get('message', 'Unknown error')}\n"
                 except:
-                    if i <= 3:
-                        print(f"      错误响应: {response.text[:100]}")
-                failed_count += 1
-                batch_success = False
-        except Exception as e:
-            print(f" ❌ (异常: {str(e)[:50]})")
+                    detail = f"      错误响应: {text[:100]}\n"
             failed_count += 1
             batch_success = False
         
-        # 添加小延迟避免过快发送
-        time.sleep(0.2)  # 增加延迟到200ms
+        buf.append(f"   发送日志 {i}/{total_count}: {source} - {level}{attack_suffix} {status_part}\n{detail}")
+        if i % 16 == 0:
+            sys.stdout.write(''.join(buf))
+            buf.clear()
+    sys.stdout.write(''.join(buf))
+    sys.stdout.flush()
     
     print(f"\n   📊 批量发送结果: {sent_count} 成功, {failed_count} 失败")
     
-    if batch_success or sent_count >= len(test_logs) * 0.8:
+    if batch_success or sent_count >= total_count * 0.8:
         success_count += 1
         print("   ✅ 批量发送测试通过")
     else:
@@ -355,16 +387,9 @@ def main():
     
     # 7. 测试无效数据处理
     total_tests += 1
-    invalid_log = {
-        "timestamp": "invalid-timestamp",
-        "level": "",  # 空级别
-        "message": "",  # 空消息
-        "source": ""  # 空来源
-    }
-    
     print("🔍 测试无效数据处理...")
     try:
-        response = requests.post(f"{API_URL}/api/v1/logs", json=invalid_log, timeout=10)
+        response = SESSION.post(f"{API_URL}/api/v1/logs", data=INVALID_LOG_BYTES, headers=JSON_HEADERS, timeout=10)
         if response.status_code == 400:
             print("   ✅ 正确拒绝了无效数据")
             success_count += 1
@@ -378,7 +403,7 @@ def main():
     total_tests += 1
     print("🔍 WebSocket端点可达性...")
     try:
-        response = requests.get(f"{API_URL}/ws", timeout=5)
+        response = SESSION.get(f"{API_URL}/ws", timeout=5)
         if response.status_code == 400:
             print("   ✅ WebSocket端点可达（返回400是正常的）")
             success_count += 1
@@ -410,7 +435,7 @@ def main():
         print("❌ 多个测试失败，请检查系统状态。")
     
     print(f"\n📋 测试数据统计:")
-    print(f"   • 总日志数: {len(test_logs)} 条")
+    print(f"   • 总日志数: {total_count} 条")
     print(f"   • 正常日志: {normal_count} 条 (包含常规访问、API调用等)")
     print(f"   • 异常日志: {anomalous_count} 条 (包含以下类型):")
     print(f"     - SQL注入攻击: 3 条")